@@ -45,5 +45,62 @@ async def update_config(config: ConfigUpdate):
         
     if config.default_model:
         settings.DEFAULT_MODEL = config.default_model
+
+    # Pooled LLM clients were built with the old key/model
+    from app.services.llm_factory import llm_factory
+    llm_factory.reset()
         
     return {"status": "updated", "config": await get_config()}
+
+@router.get("/cache")
+async def get_cache_stats():
+    """LLM response cache hit/miss counters and size"""
+    from app.services.llm_cache import llm_cache
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.stats()}
+
+@router.delete("/cache")
+async def clear_cache():
+    from app.services.llm_cache import llm_cache
+    if llm_cache is not None:
+        llm_cache.clear()
+    return {"status": "cleared"}
+
+@router.get("/embedding-cache")
+async def get_embedding_cache_stats():
+    """Embedding cache hit rate and occupancy, for sizing EMBEDDING_CACHE_MAX_ENTRIES"""
+    from app.services.embedding_cache import embedding_cache
+    if embedding_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_cache.stats()}
+
+@router.get("/rate-limits")
+async def get_rate_limits():
+    """Per provider/model limiter state: configured limits, adaptive factor, queue depth"""
+    from app.services.rate_limiter import rate_governor
+    return rate_governor.stats()
+
+@router.get("/graph-writes")
+async def get_graph_write_stats():
+    """Graph write-behind queue: depth, batch sizes, flush latency"""
+    from app.services.graph_writer import graph_writer
+    return graph_writer.stats()
+
+@router.get("/entity-aliases")
+async def get_entity_alias_stats():
+    """Canonical entity names and known aliases per label"""
+    from app.services.entity_canonicalizer import entity_canonicalizer
+    return entity_canonicalizer.stats()
+
+@router.get("/cypher-cache")
+async def get_cypher_cache_stats():
+    """Smart search plan and result cache hit rates"""
+    from app.services.cypher_cache import cypher_cache
+    return cypher_cache.stats()
+
+@router.get("/insights-index")
+async def get_insights_index_stats():
+    """Materialized entity degree index behind /strategic/insights/recent"""
+    from app.services.graph_insights import degree_index
+    return degree_index.stats()
@@ -2,16 +2,22 @@ from fastapi import APIRouter, HTTPException
 from app.services.knowledge_graph_service import knowledge_graph_service
 from app.services.llm_factory import llm_factory
 from app.db.neo4j import neo4j_conn
+from app.services.graph_insights import degree_index
 
 router = APIRouter()
 
 @router.get("/insights/recent")
-async def get_recent_insights():
+async def get_recent_insights(window_days: int = None, limit: int = 10):
     """
-    Get recent strategic insights. Returns empty list if Graph DB is offline.
+    Get recent strategic insights: the most connected people, companies and
+    topics, all-time or over the last window_days days. Served from the
+    materialized degree index; falls back to querying the graph until that
+    is loaded. Returns empty list if Graph DB is offline.
     """
-    session = neo4j_conn.get_session()
-    if not session:
+    if degree_index.ready:
+        return degree_index.top_entities(limit=limit, window_days=window_days)
+
+    if not await neo4j_conn.available():
         return [] # Graceful degradation
         
     try:
@@ -19,24 +25,19 @@ async def get_recent_insights():
         MATCH (n) 
         WHERE n:Person OR n:Company OR n:Topic
         RETURN labels(n)[0] as type, n.name as name, count{(n)--()} as connections
-        ORDER BY connections DESC LIMIT 10
+        ORDER BY connections DESC LIMIT $limit
         """
-        # Session is already open from get_session, but logic in neo4j.py was a bit weird returning raw session.
-        # Let's just use context manager if possible or close it.
-        # My neo4j.py `get_session` returns a NEW session.
-        try:
-            result = session.run(query)
-            data = [record.data() for record in result]
-            return data
-        finally:
-            session.close()
+        return await neo4j_conn.run(query, {"limit": limit})
     except Exception as e:
         print(f"Graph Error: {e}")
         return []
 
 @router.post("/search/smart")
-async def smart_search(query: str):
-    results = await knowledge_graph_service.query_graph(query)
+async def smart_search(query: str, use_cache: bool = True):
+    """
+    Answer a natural-language question from the graph. use_cache=false bypasses the LLM response cache.
+    """
+    results = await knowledge_graph_service.query_graph(query, use_cache=use_cache)
     
     # Check if results indicate error/offline
     if results and "status" in results[0] and results[0]["status"] == "offline":
@@ -47,7 +48,7 @@ async def smart_search(query: str):
         }
 
     # Synthesize answer using LangChain
-    llm = llm_factory.get_llm()
+    llm = llm_factory.get_llm(use_cache=use_cache)
     prompt = f"""
     User asked: "{query}"
     Database results: {results}
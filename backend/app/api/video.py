@@ -5,11 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from app.services.video_service import video_service
-from app.services.transcription_service import transcription_service
-from app.services.analysis_service import analysis_service
-from app.services.csv_export_service import csv_export_service
+from app.services.job_service import job_service
 from app.db.database import get_db
-from app.db.models import Meeting, Insight
+from app.db.models import Meeting
 import json
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
@@ -62,96 +60,77 @@ async def update_video(video_id: int, update_data: VideoUpdate, db: AsyncSession
     await db.refresh(meeting)
     return meeting
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_video(
     file: UploadFile = File(...),
     transcription_method: str = Form("gemini"), # "gemini" or "groq"
     llm_model: str = Form(None), # e.g. "openai/gpt-oss-120b"
     db: AsyncSession = Depends(get_db)
 ):
+    """
+    Save the upload and queue it for background processing.
+    Poll /jobs/{job_id} for progress and fetch /jobs/{job_id}/result when done.
+    """
     try:
         print(f"Received upload request for file: {file.filename}")
-        
-        # 1. Save locally
-        print("Step 1: Saving file...")
-        file_path = await video_service.save_upload(file)
+        file_path, digest = await video_service.save_upload(file)
         print(f"File saved to: {file_path}")
-        
-        # 2. Transcribe
-        print(f"Step 2: Transcribing video using {transcription_method}...")
-        transcript = await transcription_service.transcribe_video(file_path, method=transcription_method)
-        print(f"Transcription complete. Length: {len(transcript)} characters")
-        
-        # 3. Analyze
-        print(f"Step 3: Analyzing transcript using model {llm_model or 'default'}...")
-        analysis_result = await analysis_service.analyze_video_transcript(transcript, file.filename, llm_model=llm_model)
-        print(f"Analysis complete. Domain: {analysis_result.get('domain', 'unknown')}")
-        
-        # 4. Export to CSV
-        print("Step 4: Exporting to CSV...")
-        csv_path = csv_export_service.export_report_to_csv(
-            analysis_result["report"], 
-            file.filename.replace('.', '_')
-        )
-        print(f"CSV exported to: {csv_path}")
-
-        # 5. Persist to DB
-        print("Step 5: Persisting to Database...")
-        # Check if report is dict or string (it should be dict from analysis_service)
-        report_data = analysis_result.get("report", {})
-        summary_text = ""
-        if isinstance(report_data, dict):
-            summary_text = report_data.get("Summary", "") or report_data.get("summary", "")
-        else:
-            summary_text = str(report_data)
-
-        new_meeting = Meeting(
-            title=file.filename,
-            transcript_text=transcript,
-            summary_text=json.dumps(report_data) if isinstance(report_data, dict) else str(report_data),
-            file_path=str(file_path)
+
+        job = await job_service.submit(
+            db,
+            filename=file.filename,
+            file_path=file_path,
+            transcription_method=transcription_method,
+            llm_model=llm_model,
+            content_hash=digest
         )
-        db.add(new_meeting)
-        await db.flush() # flush to get ID
-
-        # Add Insights
-        # Assuming report_data has keys that are lists, we can treat them as insight types
-        if isinstance(report_data, dict):
-            for key, value in report_data.items():
-                if isinstance(value, list):
-                    for item in value:
-                        insight = Insight(
-                            meeting_id=new_meeting.id,
-                            insight_type=key,
-                            content=str(item)
-                        )
-                        db.add(insight)
-                elif isinstance(value, str) and key.lower() not in ["summary", "title"]:
-                     insight = Insight(
-                            meeting_id=new_meeting.id,
-                            insight_type=key,
-                            content=value
-                        )
-                     db.add(insight)
-        
-        await db.commit()
-        await db.refresh(new_meeting)
-        print(f"Meeting saved with ID: {new_meeting.id}")
-        
+        print(f"Job {job.id} for {file.filename} is {job.status}")
+
         return {
-            "id": new_meeting.id,
+            "job_id": job.id,
+            "status": job.status,
             "filename": file.filename,
-            "transcript": transcript,
-            "analysis": analysis_result,
-            "csv_path": csv_path,
-            "message": "Video processed and analyzed successfully"
+            "content_hash": digest,
+            "status_url": f"/api/v1/jobs/{job.id}",
+            "result_url": f"/api/v1/jobs/{job.id}/result",
+            "message": "Video already analyzed" if job.status == "completed" else "Video queued for processing"
         }
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error processing video: {str(e)}")
-        print(f"Traceback: {error_details}")
-        raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+        print(f"Error queueing video: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error queueing video: {str(e)}")
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, db: AsyncSession = Depends(get_db)):
+    """Get status of an upload job, including per-stage progress"""
+    job = await job_service.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_service.describe(job)
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, db: AsyncSession = Depends(get_db)):
+    """Get the analysis result of a completed upload job"""
+    job = await job_service.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Error processing video: {job.error}")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status} (stage: {job.stage})")
+
+    result = await db.execute(select(Meeting).where(Meeting.id == job.meeting_id))
+    meeting = result.scalars().first()
+    job_result = json.loads(job.result) if job.result else {}
+
+    return {
+        "id": job.meeting_id,
+        "job_id": job.id,
+        "filename": job.filename,
+        "transcript": meeting.transcript_text if meeting else None,
+        "analysis": job_result.get("analysis"),
+        "csv_path": job_result.get("csv_path"),
+        "message": "Video processed and analyzed successfully"
+    }
 
 @router.post("/audio/upload")
 async def upload_audio(file: UploadFile = File(...)):
@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,9 +13,121 @@ class Settings(BaseSettings):
     NEO4J_URI: str = "bolt://localhost:7687"
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
+    # Neo4j async driver pool and timeouts (seconds)
+    NEO4J_MAX_POOL_SIZE: int = 50
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 10.0
+    NEO4J_CONNECTION_TIMEOUT: float = 5.0
+    NEO4J_MAX_CONNECTION_LIFETIME: float = 3600.0
+    NEO4J_QUERY_TIMEOUT_SECONDS: float = 15.0
+    # Circuit breaker: consecutive connectivity failures before it opens, and the
+    # interval between background reconnection probes while it is open
+    NEO4J_BREAKER_FAILURE_THRESHOLD: int = 3
+    NEO4J_RECONNECT_SECONDS: float = 30.0
+    # Graph write-behind queue: queued recordings before producers wait, recordings
+    # per UNWIND transaction, max wait for a batch to fill, retries before dropping
+    GRAPH_WRITE_MAX_PENDING: int = 1000
+    GRAPH_WRITE_BATCH_SIZE: int = 50
+    GRAPH_WRITE_FLUSH_INTERVAL_SECONDS: float = 0.5
+    GRAPH_WRITE_RETRIES: int = 3
+    # Entity canonicalization: trigram Jaccard similarity needed to treat a name as an alias
+    ENTITY_MATCH_THRESHOLD: float = 0.75
+    # Smart search: cached question -> Cypher plans and query results (results also
+    # expire when this process writes to the graph)
+    CYPHER_CACHE_MAX_ENTRIES: int = 1000
+    CYPHER_RESULT_TTL_SECONDS: int = 300
+    # Insights dashboard: entities kept in the materialized top list, longest time
+    # window served, and how often degrees are re-read from the graph
+    INSIGHTS_TOP_N: int = 50
+    INSIGHTS_MAX_WINDOW_DAYS: int = 30
+    INSIGHTS_REBUILD_SECONDS: int = 3600
     
     # AI Config
     DEFAULT_MODEL: str = "openai/gpt-oss-120b"
+
+    # Provider rate limits shared by every caller (0 tokens/min = no token limit)
+    GROQ_REQUESTS_PER_MINUTE: int = 30
+    GROQ_TOKENS_PER_MINUTE: int = 60000
+    GEMINI_REQUESTS_PER_MINUTE: int = 60
+    GEMINI_TOKENS_PER_MINUTE: int = 1000000
+    # Per-model overrides, e.g. {"groq:whisper-large-v3": {"rpm": 20, "tpm": 0}}
+    RATE_LIMIT_OVERRIDES: Dict[str, Dict[str, int]] = {}
+    # Interactive callers (smart search) served per batch caller (uploads) when both wait
+    RATE_LIMIT_INTERACTIVE_WEIGHT: int = 3
+    RATE_LIMIT_MAX_BACKOFF_SECONDS: float = 60.0
+    # Lowest fraction of the configured rate the adaptive backoff will drop to
+    RATE_LIMIT_MIN_FACTOR: float = 0.1
+
+    # Shared keep-alive HTTP pool for pooled LLM clients
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE: int = 10
+    LLM_HTTP_KEEPALIVE_SECONDS: float = 60.0
+
+    # Persistent LLM response cache (SQLite, LRU-bounded).
+    # Runtime caches and stores live under ./var (a named volume in docker-compose),
+    # not in the bind-mounted source tree
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "./var/llm_cache.sqlite"
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+
+    # Embeddings: texts per embed_content request (Gemini accepts up to 100) and requests in flight
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_CONCURRENCY: int = 4
+
+    # Embedding cache: float32 vectors in a memory-mapped file, LRU beyond max entries
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: str = "./var/embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 50000
+
+    # RAG vector backend: "chroma" or "numpy" (embedded exact search, no Chroma needed)
+    VECTOR_BACKEND: str = "chroma"
+    # Chroma storage: "persistent" (on disk, survives restarts) or "memory"
+    VECTOR_STORE_MODE: str = "persistent"
+    VECTOR_STORE_DIR: str = "./var/vector_store"
+
+    # RAG chunking: target tokens per indexed chunk and tokens shared with the previous chunk
+    RAG_CHUNK_TOKENS: int = 250
+    RAG_CHUNK_OVERLAP_TOKENS: int = 40
+
+    # RAG entity extraction: chunks packed into one LLM request, and requests in flight
+    RAG_EXTRACTION_BATCH_CHUNKS: int = 8
+    RAG_EXTRACTION_CONCURRENCY: int = 4
+
+    # Hybrid retrieval: candidates taken from each of BM25 and vector search before
+    # reciprocal rank fusion, and the RRF rank constant
+    RAG_CANDIDATES: int = 20
+    RAG_RRF_K: int = 60
+    # Graph expansion: neighbouring entities followed per query entity
+    RAG_GRAPH_NEIGHBOUR_LIMIT: int = 10
+    # RAG graph persistence: snapshot + mutation log, compacted once the log passes this size
+    RAG_GRAPH_DIR: str = "./var/rag_graph"
+    RAG_GRAPH_COMPACT_BYTES: int = 8 * 1024 * 1024
+
+    # Map-reduce analysis for long transcripts (token counts are estimates)
+    ANALYSIS_MAP_REDUCE_THRESHOLD_TOKENS: int = 12000
+    ANALYSIS_SEGMENT_TOKENS: int = 4000
+    # Max segments analysed at the same time
+    ANALYSIS_CONCURRENCY: int = 4
+
+    # Audio extracted for Whisper: "opus" (small, default) or "flac" (lossless, larger)
+    TRANSCRIPTION_AUDIO_FORMAT: str = "opus"
+    TRANSCRIPTION_AUDIO_BITRATE: str = "24k"
+
+    # Groq Whisper chunking (audio over the 25MB upload limit)
+    GROQ_CHUNK_SECONDS: int = 600
+    # Audio shared between neighbouring chunks so words cut at a boundary are heard whole once
+    GROQ_CHUNK_OVERLAP_SECONDS: int = 5
+    # Max chunks encoded/transcribed at the same time
+    GROQ_TRANSCRIPTION_CONCURRENCY: int = 4
+
+    # Gemini file processing poll (exponential backoff with a deadline)
+    GEMINI_POLL_INITIAL_SECONDS: float = 1.0
+    GEMINI_POLL_MAX_SECONDS: float = 15.0
+    GEMINI_PROCESSING_TIMEOUT_SECONDS: float = 900.0
+
+    # Background Jobs
+    # Number of uploads processed concurrently by the job workers
+    JOB_WORKERS: int = 2
     
     class Config:
         env_file = ".env"
@@ -1,3 +1,4 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
@@ -27,9 +28,32 @@ async def get_db():
             await session.close()
 
 
+def _add_missing_columns(sync_conn):
+    """
+    create_all only creates missing tables; add columns introduced since an
+    existing table was created (nullable, no backfill) and their indexes.
+    Idempotent, so it runs on every startup.
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        added = [column for column in table.columns if column.name not in existing]
+        for column in added:
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            print(f"Added column {table.name}.{column.name}")
+        added_names = {column.name for column in added}
+        for index in table.indexes:
+            if added_names & {column.name for column in index.columns}:
+                index.create(sync_conn, checkfirst=True)
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
 
 # Alias for clarity in non-dependency contexts
 get_db_session = get_db
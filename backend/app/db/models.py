@@ -13,6 +13,11 @@ class Meeting(Base):
     transcript_text = Column(Text)
     summary_text = Column(Text)
     file_path = Column(String)
+
+    # Identity of the analysed upload, used to reuse results for re-uploads
+    content_hash = Column(String, index=True)  # sha256 of the uploaded file
+    transcription_method = Column(String)
+    llm_model = Column(String)
     
     # Insights relationship
     insights = relationship("Insight", back_populates="meeting")
@@ -44,3 +49,26 @@ class Contact(Base):
     # JSON fields for flexible lists
     topics = Column(Text) # JSON string of list[str]
     timeline = Column(Text) # JSON string of list[TimelineEvent]
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid hex
+    status = Column(String, index=True, default="queued")  # queued, running, completed, failed
+    stage = Column(String)  # Stage currently (or last) being worked on
+    stages = Column(Text)  # JSON string of {stage: {status, started_at, finished_at}}
+
+    # Inputs needed to (re)run the pipeline after a restart
+    filename = Column(String)
+    file_path = Column(String)
+    content_hash = Column(String, index=True)
+    transcription_method = Column(String)
+    llm_model = Column(String)
+
+    # Outputs
+    meeting_id = Column(Integer, ForeignKey("meetings.id"), nullable=True)
+    result = Column(Text)  # JSON string of {analysis, csv_path}
+    error = Column(Text)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
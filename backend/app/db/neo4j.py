@@ -1,48 +1,232 @@
-from neo4j import GraphDatabase
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from neo4j import AsyncGraphDatabase, Query, READ_ACCESS, WRITE_ACCESS, unit_of_work
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Errors that mean the server (not the query) is the problem
+CONNECTIVITY_ERRORS = (ServiceUnavailable, SessionExpired, OSError)
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. Open: calls fail fast (no connection attempt)
+    while a background probe retries every NEO4J_RECONNECT_SECONDS.
+    Half-open: a probe is checking the server; calls still fail fast until it
+    succeeds and closes the breaker. Opens after failure_threshold
+    consecutive connectivity failures, or at once when connecting fails.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int):
+        self.failure_threshold = failure_threshold
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self.last_checked = None
+        self.last_error = None
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.warning("Neo4j reachable again; graph features re-enabled.")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.last_checked = time.time()
+
+    def record_failure(self, error, trip: bool = False):
+        self.failures += 1
+        self.last_error = str(error)
+        self.last_checked = time.time()
+        if self.state == self.HALF_OPEN:
+            # Probe failed; stay open
+            self.state = self.OPEN
+        elif self.state == self.CLOSED and (trip or self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = time.time()
+            self.trips += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "opened_at": self.opened_at,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error
+        }
+
 class Neo4jConnection:
+    """
+    Lazily connected async Neo4j driver with a shared, tuned connection pool.
+    Sessions are borrowed per query and returned to the pool on exit; every
+    query runs with a server-side transaction timeout. A circuit breaker makes
+    the offline path instant: once the server is unreachable, callers get
+    "unavailable" straight away while a background task probes for recovery.
+    Connect listeners run after every successful (re)connect, so setup that
+    needs the server happens whenever it becomes reachable.
+    """
     def __init__(self):
         self.driver = None
+        self.breaker = CircuitBreaker(settings.NEO4J_BREAKER_FAILURE_THRESHOLD)
+        self._lock = None
+        self._probe = None
+        self._attempted = False
+        self._connect_listeners = []
+        # Bumped on every successful connect; lets listeners skip repeat runs
+        self.generation = 0
 
-    def connect(self):
-        if not self.driver:
+    def add_connect_listener(self, listener):
+        """
+        Registers an async callable run (as a task) after each successful connect.
+        """
+        self._connect_listeners.append(listener)
+
+    def _connect_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def connect(self):
+        async with self._connect_lock():
+            if self.driver and self.breaker.state == CircuitBreaker.CLOSED:
+                return
+            self._attempted = True
+            driver = None
             try:
-                self.driver = GraphDatabase.driver(
+                # Inside the try: a malformed NEO4J_URI raises here (ConfigurationError),
+                # and must open the breaker like an unreachable server
+                driver = AsyncGraphDatabase.driver(
                     settings.NEO4J_URI,
-                    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+                    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                    max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+                    connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+                    connection_timeout=settings.NEO4J_CONNECTION_TIMEOUT,
+                    max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME
                 )
                 # Test connection
-                self.driver.verify_connectivity()
+                await driver.verify_connectivity()
             except Exception as e:
-                logger.warning(f"Failed to connect to Neo4j: {e}. Graph features will be disabled.")
-                self.driver = None
+                if self.breaker.state == CircuitBreaker.CLOSED:
+                    logger.warning(f"Failed to connect to Neo4j: {e}. Graph features will be disabled.")
+                self.breaker.record_failure(e, trip=True)
+                if driver is not None:
+                    await driver.close()
+                self._start_probe()
+                return
+            old_driver, self.driver = self.driver, driver
+            if old_driver:
+                await old_driver.close()
+            self.breaker.record_success()
+            self.generation += 1
+            for listener in self._connect_listeners:
+                asyncio.create_task(listener())
 
-    def close(self):
-        if self.driver:
-            self.driver.close()
+    def _start_probe(self):
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.create_task(self._probe_loop())
 
-    def get_session(self):
-        if not self.driver:
-            self.connect()
-        
+    async def _probe_loop(self):
+        while self.breaker.state != CircuitBreaker.CLOSED:
+            await asyncio.sleep(settings.NEO4J_RECONNECT_SECONDS)
+            self.breaker.state = CircuitBreaker.HALF_OPEN
+            await self.connect()
+
+    async def _on_error(self, error):
+        """
+        Feeds a failed call into the breaker; connectivity errors can open it.
+        """
+        if not isinstance(error, CONNECTIVITY_ERRORS):
+            return
+        self.breaker.record_failure(error)
+        if self.breaker.state == CircuitBreaker.OPEN:
+            logger.warning(f"Neo4j unreachable: {error}. Graph features will be disabled.")
+            self._start_probe()
+
+    async def close(self):
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
         if self.driver:
-            return self.driver.session()
-        return None
+            await self.driver.close()
+            self.driver = None
 
-neo4j_conn = Neo4jConnection()
+    async def available(self) -> bool:
+        """
+        True if the breaker is closed and a driver is connected. Connects
+        lazily on first use; never blocks while the breaker is open.
+        """
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            self._start_probe()
+            return False
+        if not self.driver and not self._attempted:
+            await self.connect()
+        return self.driver is not None and self.breaker.state == CircuitBreaker.CLOSED
 
-def get_neo4j_session():
-    # Attempt to connect lazily
-    session = neo4j_conn.get_session()
-    if session:
-        try:
+    def health(self) -> dict:
+        """
+        Cached connectivity status (no round trip).
+        """
+        return {"connected": self.driver is not None and self.breaker.state == CircuitBreaker.CLOSED, **self.breaker.snapshot()}
+
+    @asynccontextmanager
+    async def session(self, write: bool = False):
+        """
+        Borrows a pooled async session (None if unconnected, services must handle this).
+        """
+        if not await self.available():
+            yield None
+            return
+        async with self.driver.session(default_access_mode=WRITE_ACCESS if write else READ_ACCESS) as session:
             yield session
-        finally:
-            session.close()
-    else:
-        # Yield None if unconnected, services must handle this
-        yield None
+
+    async def run(self, query: str, parameters: dict = None, write: bool = False, timeout: float = None):
+        """
+        Runs one query and returns its records as dicts. Raises if unconnected.
+        """
+        timeout = timeout or settings.NEO4J_QUERY_TIMEOUT_SECONDS
+        async with self.session(write=write) as session:
+            if session is None:
+                raise ConnectionError("Graph database disconnected")
+            try:
+                result = await session.run(Query(query, timeout=timeout), parameters or {})
+                data = await result.data()
+            except Exception as e:
+                await self._on_error(e)
+                raise
+        self.breaker.record_success()
+        return data
+
+    async def run_transaction(self, statements, timeout: float = None):
+        """
+        Runs [(query, parameters)] in one managed write transaction (retried by the driver on transient errors).
+        """
+        timeout = timeout or settings.NEO4J_QUERY_TIMEOUT_SECONDS
+
+        @unit_of_work(timeout=timeout)
+        async def work(tx):
+            for query, parameters in statements:
+                result = await tx.run(query, parameters)
+                await result.consume()
+
+        async with self.session(write=True) as session:
+            if session is None:
+                raise ConnectionError("Graph database disconnected")
+            try:
+                await session.execute_write(work)
+            except Exception as e:
+                await self._on_error(e)
+                raise
+        self.breaker.record_success()
+
+neo4j_conn = Neo4jConnection()
+
+async def get_neo4j_session():
+    # Attempt to connect lazily; yields None if unconnected, services must handle this
+    async with neo4j_conn.session() as session:
+        yield session
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
@@ -29,13 +30,36 @@ async def on_startup():
         await seed_database(db)
         break # Only need one session
 
+    # Graph constraints and alias index (doesn't hold up startup if Neo4j is slow or down)
+    from app.services.knowledge_graph_service import knowledge_graph_service
+    asyncio.create_task(knowledge_graph_service.initialize())
+
+    # Background workers for queued uploads
+    from app.services.job_service import job_service
+    await job_service.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    from app.services.job_service import job_service
+    await job_service.stop()
+
+    # Flush queued graph writes before the driver goes away
+    from app.services.graph_writer import graph_writer
+    await graph_writer.stop()
+
+    from app.db.neo4j import neo4j_conn
+    await neo4j_conn.close()
+
 @app.get("/")
 async def root():
     return {"message": "GenAI Video Analysis Tool API is running"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Neo4j state comes from the circuit breaker's cached status, not a live check
+    from app.db.neo4j import neo4j_conn
+    neo4j = neo4j_conn.health()
+    return {"status": "healthy" if neo4j["state"] == "closed" else "degraded", "neo4j": neo4j}
 
 from app.api import video, mcp, a2a, strategic, config, contacts
 app.include_router(video.router, prefix="/api/v1", tags=["video"])
@@ -1,47 +1,17 @@
 from app.services.llm_factory import llm_factory
 from app.services.knowledge_graph_service import knowledge_graph_service
+from app.services.text_chunker import estimate_tokens, split_into_segments
+from app.core.config import settings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from collections import Counter
+import asyncio
 import json
+import time
 
-class AnalysisService:
-    async def analyze_video_transcript(self, transcript: str, filename: str, llm_model: str = None):
-        
-        # 1. Graph Extraction (Fire and forget or await)
-        await knowledge_graph_service.process_transcript_for_graph(transcript, filename)
-
-        # 2. Main Analysis with LangChain
-        llm = llm_factory.get_llm(model_name=llm_model)
-
-        # Chain 1: Domain Detection
-        domain_prompt = ChatPromptTemplate.from_messages([
-            ("system", "Analyze the transcript. Determine domain and suggested report fields. Return JSON."),
-            ("user", "Transcript: {transcript}")
-        ])
-        domain_chain = domain_prompt | llm | JsonOutputParser()
-        
-        try:
-            domain_data = await domain_chain.ainvoke({"transcript": transcript[:2000]})
-        except Exception as e:
-            # Fallback
-            domain_data = {"domain": "General", "fields": ["Summary", "Key Points"]}
-
-        # Chain 2: Report Generation
-        # Enforce these fields regardless of domain
-        fields = ["Summary", "Key_Insights", "Promises_Made", "Next_Steps", "Conversation_Graph", "Intelligence"]
-        
-        # We need to guide the LLM on what "Conversation_Graph" means in this JSON context
-        # It should extract nodes/edges textually or summarize them if the graph DB is separate.
-        # OR better: we inject the graph data we just extracted into the prompt so the LLM can refine it for the report json.
-        
-        # Actually, let's just ask LLM to extract these as text lists/objects.
-        # "Conversation_Graph" in JSON can be a list of "Entity: Relation" strings for display.
-        
-        report_prompt = ChatPromptTemplate.from_messages([
-            ("system", f"""
-            Generate a detailed video analysis report in strict JSON format.
-            Domain identified: {domain_data.get('domain', 'General')}
-            
+# Report fields enforced regardless of domain.
+# Braces are doubled because this text goes through ChatPromptTemplate
+REPORT_SCHEMA = """
             Structure the JSON with these exact keys:
             - "Summary": "Executive summary of the content"
             - "Key_Insights": ["List of key points"]
@@ -49,29 +19,231 @@ class AnalysisService:
             - "Next_Steps": ["List of action items"]
             - "Conversation_Graph": {{ "People": [], "Companies": [], "Topics": [] }}  <-- Extract entities mentioned
             - "Intelligence": {{ "Sentiment": "Positive/Neutral/Negative", "Tone": "String", "Complexity": "Low/Medium/High" }}
-            
+"""
+
+COMPLEXITY_ORDER = ["Low", "Medium", "High"]
+
+# Prompts are built once at import; chains on top of them are compiled once per model via llm_factory.get_chain
+DOMAIN_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Analyze the transcript. Determine domain and suggested report fields. Return JSON."),
+    ("user", "Transcript: {transcript}")
+])
+
+# "Conversation_Graph" in JSON is a list of entities for display; the Neo4j graph is for the graph view.
+# The report doesn't wait for domain detection: the model infers the domain from the full transcript.
+REPORT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+            Generate a detailed video analysis report in strict JSON format.
+            Identify the business domain of the conversation and tailor the analysis to it.
+            """ + REPORT_SCHEMA + """
+            Ensure all fields are present.
+            """),
+    ("user", "Transcript: {transcript}")
+])
+
+MAP_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+            You are analysing segment {index} of {total} of a longer video transcript.
+            Generate a partial analysis report for this segment only, in strict JSON format.
+            Add a key "Domain" with the business domain of the conversation.
+            """ + REPORT_SCHEMA + """
             Ensure all fields are present.
             """),
-            ("user", "Transcript: {transcript}")
-        ])
-        
-        report_chain = report_prompt | llm | JsonOutputParser()
-        
+    ("user", "Transcript segment: {transcript}")
+])
+
+SUMMARY_REDUCE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Domain: {domain}. Combine these consecutive partial summaries of one conversation into a single executive summary. Return only the summary text."),
+    ("user", "{summaries}")
+])
+
+def _json_chain(prompt):
+    return lambda llm: prompt | llm | JsonOutputParser()
+
+def _dedupe(items):
+    """
+    Order-preserving de-duplication (case/whitespace-insensitive for strings).
+    """
+    seen = set()
+    result = []
+    for item in items:
+        key = item.strip().lower() if isinstance(item, str) else json.dumps(item, sort_keys=True, default=str)
+        if key in seen:
+            continue
+        seen.add(key)
+        result.append(item)
+    return result
+
+def _most_common(values, default):
+    values = [v for v in values if isinstance(v, str) and v]
+    return Counter(values).most_common(1)[0][0] if values else default
+
+async def run_stages(stages: dict, timings: dict) -> dict:
+    """
+    Runs a small dependency graph of async stages.
+    `stages` maps name -> (dependency names, async fn); each fn is called with
+    the results of its dependencies as keyword arguments and starts as soon as
+    they finish, so independent stages overlap. Wall time of every stage is
+    recorded (seconds) in `timings`. Returns {name: result}.
+    """
+    tasks = {}
+
+    async def run(name: str, deps, fn):
+        inputs = {dep: await tasks[dep] for dep in deps}
+        start = time.perf_counter()
+        try:
+            return await fn(**inputs)
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+
+    # Dependencies must be declared before their dependents
+    for name, (deps, fn) in stages.items():
+        tasks[name] = asyncio.create_task(run(name, deps, fn))
+
+    results = await asyncio.gather(*tasks.values())
+    return dict(zip(tasks.keys(), results))
+
+class AnalysisService:
+    async def analyze_video_transcript(self, transcript: str, filename: str, llm_model: str = None):
+        """
+        Stages: graph extraction runs alongside the report chain. In the
+        single-prompt path domain detection and the report are independent
+        calls too, so latency is roughly that of the slowest call.
+        """
+        timings = {}
+        started = time.perf_counter()
+
+        stages = {"graph": ([], lambda: self._extract_graph(transcript, filename))}
+
+        # Long transcripts don't fit one prompt: analyse segments in parallel and merge
+        if estimate_tokens(transcript) > settings.ANALYSIS_MAP_REDUCE_THRESHOLD_TOKENS:
+            stages["analysis"] = ([], lambda: self.analyze_map_reduce(transcript, llm_model))
+            results = await run_stages(stages, timings)
+            analysis = results["analysis"]
+        else:
+            stages["domain"] = ([], lambda: self._detect_domain(transcript, llm_model))
+            stages["report"] = ([], lambda: self._generate_report(transcript, llm_model))
+            results = await run_stages(stages, timings)
+            analysis = {
+                "domain": results["domain"].get("domain", "General"),
+                "report": results["report"]
+            }
+
+        timings["total"] = round(time.perf_counter() - started, 3)
+        print(f"Analysis stage timings (s): {timings}")
+        analysis["timings"] = timings
+        return analysis
+
+    async def _extract_graph(self, transcript: str, filename: str):
+        # Graph extraction failures must not fail the report
         try:
-            report_data = await report_chain.ainvoke({"transcript": transcript})
-            
-            # Merge the Neo4j graph data if we have it? 
-            # Actually, let's just rely on the LLM's fresh extraction for the report JSON display
-            # The Neo4j graph is for the graph view.
-            # But the user asked "that will also be generated right? just like in ui". 
-            # So the UI needs this data structure.
+            return await knowledge_graph_service.process_transcript_for_graph(transcript, filename)
         except Exception as e:
-             print(f"Report generation error: {e}")
-             report_data = {"error": str(e)}
-        
+            print(f"Graph extraction error: {e}")
+            return {}
+
+    async def _detect_domain(self, transcript: str, llm_model: str = None):
+        domain_chain = llm_factory.get_chain("domain", _json_chain(DOMAIN_PROMPT), model_name=llm_model)
+
+        try:
+            domain_data = await domain_chain.ainvoke({"transcript": transcript[:2000]})
+            if isinstance(domain_data, dict):
+                return domain_data
+        except Exception as e:
+            print(f"Domain detection error: {e}")
+        # Fallback
+        return {"domain": "General", "fields": ["Summary", "Key Points"]}
+
+    async def _generate_report(self, transcript: str, llm_model: str = None):
+        report_chain = llm_factory.get_chain("report", _json_chain(REPORT_PROMPT), model_name=llm_model)
+
+        try:
+            return await report_chain.ainvoke({"transcript": transcript})
+        except Exception as e:
+            print(f"Report generation error: {e}")
+            return {"error": str(e)}
+
+    async def analyze_map_reduce(self, transcript: str, llm_model: str = None):
+        """
+        Map: split the transcript into token-budgeted segments and extract a
+        partial report (plus domain) from each, ANALYSIS_CONCURRENCY at a time.
+        Reduce: merge the partials into the standard report schema; only the
+        summaries need one more LLM call to be combined.
+        """
+        segments = split_into_segments(transcript, settings.ANALYSIS_SEGMENT_TOKENS)
+        print(f"Map-reduce analysis over {len(segments)} segments")
+
+        map_chain = llm_factory.get_chain("report_map", _json_chain(MAP_PROMPT), model_name=llm_model)
+        semaphore = asyncio.Semaphore(max(1, settings.ANALYSIS_CONCURRENCY))
+
+        async def map_segment(index: int, segment: str):
+            async with semaphore:
+                try:
+                    partial = await map_chain.ainvoke({"index": index + 1, "total": len(segments), "transcript": segment})
+                    return partial if isinstance(partial, dict) else None
+                except Exception as e:
+                    print(f"Segment {index + 1} analysis error: {e}")
+                    return None
+
+        partials = await asyncio.gather(*[map_segment(i, seg) for i, seg in enumerate(segments)])
+        partials = [p for p in partials if p]
+        if not partials:
+            return {"domain": "General", "report": {"error": "All transcript segments failed to analyse"}}
+
+        domain = _most_common([p.get("Domain") for p in partials], "General")
+        report = self._merge_reports(partials)
+        report["Summary"] = await self._reduce_summaries([p.get("Summary") for p in partials], domain, llm_model)
+
         return {
-            "domain": domain_data.get("domain", "General"),
-            "report": report_data
+            "domain": domain,
+            "report": report
         }
 
+    def _merge_reports(self, partials):
+        """
+        Merges partial reports field by field: lists are concatenated in segment
+        order and de-duplicated, Intelligence is decided by vote.
+        """
+        report = {"Summary": ""}
+        for key in ["Key_Insights", "Promises_Made", "Next_Steps"]:
+            items = []
+            for p in partials:
+                value = p.get(key) or []
+                items.extend(value if isinstance(value, list) else [value])
+            report[key] = _dedupe(items)
+
+        graph = {"People": [], "Companies": [], "Topics": []}
+        for p in partials:
+            partial_graph = p.get("Conversation_Graph")
+            if isinstance(partial_graph, dict):
+                for key in graph:
+                    graph[key].extend(partial_graph.get(key) or [])
+        report["Conversation_Graph"] = {key: _dedupe(values) for key, values in graph.items()}
+
+        intel = [p["Intelligence"] for p in partials if isinstance(p.get("Intelligence"), dict)]
+        complexities = [i.get("Complexity") for i in intel if i.get("Complexity") in COMPLEXITY_ORDER]
+        report["Intelligence"] = {
+            "Sentiment": _most_common([i.get("Sentiment") for i in intel], "Neutral"),
+            "Tone": _most_common([i.get("Tone") for i in intel], "Neutral"),
+            # The whole conversation is at least as complex as its hardest part
+            "Complexity": max(complexities, key=COMPLEXITY_ORDER.index) if complexities else "Medium"
+        }
+        return report
+
+    async def _reduce_summaries(self, summaries, domain: str, llm_model: str = None) -> str:
+        summaries = [s for s in summaries if isinstance(s, str) and s.strip()]
+        if len(summaries) <= 1:
+            return summaries[0] if summaries else ""
+
+        reduce_chain = llm_factory.get_chain("summary_reduce", lambda llm: SUMMARY_REDUCE_PROMPT | llm, model_name=llm_model)
+        try:
+            response = await reduce_chain.ainvoke({
+                "domain": domain,
+                "summaries": "\n\n".join(f"Part {i + 1}: {s}" for i, s in enumerate(summaries))
+            })
+            return response.content.strip()
+        except Exception as e:
+            print(f"Summary reduce error: {e}")
+            return " ".join(summaries)
+
 analysis_service = AnalysisService()
@@ -0,0 +1,144 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from app.core.config import settings
+
+_QUOTED = re.compile(r"\"([^\"]+)\"|'([^']+)'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$p\d+")
+_NOISE = re.compile(r"[^\w$\s]")
+
+# Clauses that would modify the graph or reach outside it
+_WRITE_CLAUSES = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b|\bCALL\s+(dbms|db\.create|apoc)",
+    re.IGNORECASE
+)
+
+def parameterize(question: str, canonicalizer):
+    """
+    Replaces known entity names, quoted strings and numbers in question with
+    $p0, $p1, ... Returns (normalised template, prompt, {param: value}, {param: kind}).
+    The lowercased template is only a cache key, so "meetings with Alice" and
+    "meetings with Bob" share one plan; prompt keeps the question's original
+    case and punctuation (only the placeholders substituted) for the LLM, so
+    names the alias index doesn't know keep their case in the generated Cypher.
+    """
+    spans = [(start, end, label, name) for start, end, label, name in canonicalizer.find_mentions(question)]
+    taken = lambda s, e: any(s < end and start < e for start, end, _, _ in spans)
+    for match in _QUOTED.finditer(question):
+        if not taken(match.start(), match.end()):
+            spans.append((match.start(), match.end(), "value", match.group(1) or match.group(2)))
+    for match in _NUMBER.finditer(question):
+        if not taken(match.start(), match.end()):
+            value = match.group()
+            spans.append((match.start(), match.end(), "number", float(value) if "." in value else int(value)))
+    spans.sort()
+
+    parts = []
+    params = {}
+    kinds = {}
+    cursor = 0
+    for i, (start, end, kind, value) in enumerate(spans):
+        parts.append(question[cursor:start])
+        parts.append(f"$p{i}")
+        params[f"p{i}"] = value
+        kinds[f"p{i}"] = kind
+        cursor = end
+    parts.append(question[cursor:])
+
+    prompt = "".join(parts).strip()
+    template = " ".join(_NOISE.sub(" ", prompt.lower()).split())
+    return template, prompt, params, kinds
+
+def validate_cypher(cypher: str, params: dict):
+    """
+    Returns an error message, or None if cypher is a read-only query using only known parameters.
+    """
+    if not cypher:
+        return "Empty query"
+    if _WRITE_CLAUSES.search(cypher):
+        return "Only read-only queries are allowed"
+    unknown = {p[1:] for p in _PLACEHOLDER.findall(cypher)} - set(params)
+    if unknown:
+        return f"Unknown parameters: {sorted(unknown)}"
+    return None
+
+class CypherCache:
+    """
+    Two LRU caches in front of query_graph:
+    - plans: question template (+ parameter kinds) -> Cypher, so repeated and
+      near-repeated questions skip the LLM translation
+    - results: (Cypher, parameters) -> records, valid while the graph write
+      version is unchanged and for at most CYPHER_RESULT_TTL_SECONDS
+      (writes made outside this process aren't seen by the version counter)
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._plans = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.plan_hits = 0
+        self.plan_misses = 0
+        self.result_hits = 0
+        self.result_misses = 0
+
+    def _plan_key(self, template: str, kinds: dict):
+        return template, tuple(sorted(kinds.items()))
+
+    def _put(self, store: OrderedDict, key, value):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.max_entries:
+            store.popitem(last=False)
+
+    def get_plan(self, template: str, kinds: dict):
+        key = self._plan_key(template, kinds)
+        with self._lock:
+            cypher = self._plans.get(key)
+            if cypher is None:
+                self.plan_misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.plan_hits += 1
+            return cypher
+
+    def put_plan(self, template: str, kinds: dict, cypher: str):
+        with self._lock:
+            self._put(self._plans, self._plan_key(template, kinds), cypher)
+
+    def _result_key(self, cypher: str, params: dict):
+        return cypher, tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+    def get_result(self, cypher: str, params: dict, version: int):
+        key = self._result_key(cypher, params)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None or entry[0] != version or time.monotonic() - entry[1] > settings.CYPHER_RESULT_TTL_SECONDS:
+                self.result_misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.result_hits += 1
+            return entry[2]
+
+    def put_result(self, cypher: str, params: dict, version: int, results: list):
+        with self._lock:
+            self._put(self._results, self._result_key(cypher, params), (version, time.monotonic(), results))
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self._results.clear()
+
+    def stats(self) -> dict:
+        return {
+            "plans": len(self._plans),
+            "results": len(self._results),
+            "max_entries": self.max_entries,
+            "plan_hits": self.plan_hits,
+            "plan_misses": self.plan_misses,
+            "result_hits": self.result_hits,
+            "result_misses": self.result_misses
+        }
+
+cypher_cache = CypherCache(settings.CYPHER_CACHE_MAX_ENTRIES)
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.core.config import settings
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed on (model, sha256(text)).
+    Vectors live as float32 rows in a memory-mapped file (vectors.f32); a small
+    SQLite index maps keys to row slots and remembers last access for LRU
+    eviction. Once max_entries rows are used, the least recently used slot is
+    overwritten.
+    """
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # key -> slot, least recently used first (slots beyond a reduced capacity are dropped)
+        self._conn.execute("DELETE FROM entries WHERE slot >= ?", (max_entries,))
+        self._slots = OrderedDict(
+            self._conn.execute("SELECT key, slot FROM entries ORDER BY accessed_at").fetchall()
+        )
+        self._free = sorted(set(range(max_entries)) - set(self._slots.values()), reverse=True)
+
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._vectors = None
+        if self.dim:
+            self._open_vectors()
+
+    def _open_vectors(self):
+        path = os.path.join(self.directory, "vectors.f32")
+        # Grow the (sparse) file to capacity; it may be new or max_entries may have increased
+        size = self.max_entries * self.dim * np.dtype(np.float32).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(self.max_entries, self.dim))
+
+    def _key(self, model: str, text: str) -> str:
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, model: str, texts):
+        """
+        Returns a list aligned with texts: the cached vector (list of floats) or None.
+        """
+        results = []
+        touched = []
+        now = time.time()
+        with self._lock:
+            for text in texts:
+                key = self._key(model, text)
+                slot = self._slots.get(key)
+                if slot is None or self._vectors is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self._slots.move_to_end(key)
+                touched.append((now, key))
+                self.hits += 1
+                results.append(self._vectors[slot].tolist())
+
+            if touched:
+                self._conn.executemany("UPDATE entries SET accessed_at = ? WHERE key = ?", touched)
+                self._conn.commit()
+        return results
+
+    def put_many(self, model: str, texts, vectors):
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                if self.dim is None:
+                    self.dim = int(vector.shape[0])
+                    self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+                    self._open_vectors()
+                if vector.shape != (self.dim,):
+                    # A model with another dimensionality; don't cache rather than corrupt rows
+                    continue
+
+                key = self._key(model, text)
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        evicted_key, slot = self._slots.popitem(last=False)
+                        self._conn.execute("DELETE FROM entries WHERE key = ?", (evicted_key,))
+                        self.evictions += 1
+                self._vectors[slot] = vector
+                self._slots[key] = slot
+                self._slots.move_to_end(key)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, slot, accessed_at) VALUES (?, ?, ?)",
+                    (key, slot, time.time())
+                )
+
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "dim": self.dim,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+embedding_cache = EmbeddingCache(
+    settings.EMBEDDING_CACHE_DIR,
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+) if settings.EMBEDDING_CACHE_ENABLED else None
@@ -0,0 +1,143 @@
+import re
+from collections import Counter, defaultdict
+from app.core.config import settings
+
+# Legal-form suffixes dropped from company names ("ACME Inc." -> "acme")
+COMPANY_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "llc", "plc", "gmbh", "ag", "sa", "bv", "pty", "group", "holdings"
+}
+
+_WORD = re.compile(r"[^\W_]+")
+
+def normalize_name(name: str, label: str) -> str:
+    words = _WORD.findall(name.lower())
+    if label == "Company":
+        while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+            words.pop()
+    return " ".join(words)
+
+def _trigrams(key: str):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class AliasIndex:
+    """
+    Canonical names of one node label. Exact matches on the normalised key
+    are a dict lookup; otherwise candidates sharing character trigrams are
+    scored by Jaccard similarity and the best one at or above the threshold
+    wins. Unmatched names become new canonical entries.
+    """
+    def __init__(self, label: str, threshold: float):
+        self.label = label
+        self.threshold = threshold
+        self.canonical = {} # normalised key -> canonical display name
+        self.aliases = {} # normalised alias -> canonical key
+        self.grams = {} # canonical key -> trigrams
+        self.postings = defaultdict(set) # trigram -> canonical keys
+
+    def _add_canonical(self, key: str, name: str):
+        self.canonical[key] = name
+        self.aliases[key] = key
+        grams = _trigrams(key)
+        self.grams[key] = grams
+        for gram in grams:
+            self.postings[gram].add(key)
+
+    def _fuzzy_match(self, key: str):
+        grams = _trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for candidate in self.postings.get(gram, ()):
+                shared[candidate] += 1
+        best, best_score = None, 0.0
+        for candidate, overlap in shared.items():
+            score = overlap / (len(grams) + len(self.grams[candidate]) - overlap)
+            if score > best_score:
+                best, best_score = candidate, score
+        return best if best_score >= self.threshold else None
+
+    def resolve(self, name: str):
+        """
+        Returns the canonical name for name (registering it if it is new), or None if it normalises to nothing.
+        """
+        key = normalize_name(name, self.label)
+        if not key:
+            return None
+        canonical_key = self.aliases.get(key)
+        if canonical_key is None:
+            canonical_key = self._fuzzy_match(key)
+            if canonical_key is None:
+                self._add_canonical(key, name.strip())
+                canonical_key = key
+            self.aliases[key] = canonical_key
+        return self.canonical[canonical_key]
+
+    def seed(self, names):
+        """
+        Registers names already in the graph as canonical (exact keys only, no merging).
+        """
+        for name in names:
+            key = normalize_name(name, self.label)
+            if key and key not in self.canonical:
+                self._add_canonical(key, name)
+
+    def stats(self) -> dict:
+        return {"canonical": len(self.canonical), "aliases": len(self.aliases)}
+
+class EntityCanonicalizer:
+    """
+    Maps extracted entity names to canonical graph names before they are
+    written, one alias index per label.
+    """
+    def __init__(self, threshold: float = None):
+        threshold = threshold if threshold is not None else settings.ENTITY_MATCH_THRESHOLD
+        self.indexes = {label: AliasIndex(label, threshold) for label in ["Person", "Company", "Topic"]}
+
+    def canonicalize(self, label: str, names):
+        """
+        Canonical names for names, de-duplicated, in first-seen order.
+        """
+        index = self.indexes[label]
+        result = []
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            canonical = index.resolve(name)
+            if canonical and canonical not in result:
+                result.append(canonical)
+        return result
+
+    def seed(self, label: str, names):
+        self.indexes[label].seed(names)
+
+    def find_mentions(self, text: str, max_words: int = 6):
+        """
+        Known entities named in text, longest match first and non-overlapping:
+        [(start, end, label, canonical name)] with character offsets.
+        """
+        words = list(_WORD.finditer(text))
+        mentions = []
+        i = 0
+        while i < len(words):
+            match = None
+            for n in range(min(max_words, len(words) - i), 0, -1):
+                phrase = " ".join(w.group() for w in words[i:i + n])
+                for label, index in self.indexes.items():
+                    canonical_key = index.aliases.get(normalize_name(phrase, label))
+                    if canonical_key is not None:
+                        match = (words[i].start(), words[i + n - 1].end(), label, index.canonical[canonical_key], n)
+                        break
+                if match:
+                    break
+            if match:
+                mentions.append(match[:4])
+                i += match[4]
+            else:
+                i += 1
+        return mentions
+
+    def stats(self) -> dict:
+        return {label: index.stats() for label, index in self.indexes.items()}
+
+entity_canonicalizer = EntityCanonicalizer()
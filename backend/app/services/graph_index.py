@@ -0,0 +1,87 @@
+import re
+import threading
+from itertools import islice
+from collections import defaultdict
+
+_WORD = re.compile(r"\w+")
+
+def entity_key(name: str) -> str:
+    """
+    Normalised lookup key for an entity name ("Acme  Corp." -> "acme corp").
+    """
+    return " ".join(_WORD.findall(name.lower()))
+
+class EntityIndex:
+    """
+    Precomputed lookups over the RAG entity graph, kept next to the networkx
+    graph so queries never traverse it:
+    - entity key -> chunk ids mentioning it (oldest first)
+    - entity key -> neighbouring entity keys (1 hop)
+    Query expansion is a handful of dict lookups, independent of graph size.
+    """
+    def __init__(self):
+        self.entity_chunks = defaultdict(dict) # dict as an ordered set
+        self.neighbours = defaultdict(set)
+        self.max_words = 1
+        self._lock = threading.Lock()
+
+    def _register(self, key: str):
+        self.max_words = max(self.max_words, key.count(" ") + 1)
+
+    def add_mentions(self, mentions):
+        """
+        mentions: iterable of (entity name, chunk id).
+        """
+        with self._lock:
+            for name, chunk_id in mentions:
+                key = entity_key(name)
+                if key:
+                    self._register(key)
+                    self.entity_chunks[key][chunk_id] = None
+
+    def add_relationships(self, pairs):
+        """
+        pairs: iterable of (source name, target name).
+        """
+        with self._lock:
+            for source, target in pairs:
+                source, target = entity_key(source), entity_key(target)
+                if source and target and source != target:
+                    self._register(source)
+                    self._register(target)
+                    self.neighbours[source].add(target)
+                    self.neighbours[target].add(source)
+
+    def match_entities(self, text: str):
+        """
+        Known entities named in text, found by looking up its word n-grams.
+        """
+        words = _WORD.findall(text.lower())
+        found = []
+        for size in range(min(self.max_words, len(words)), 0, -1):
+            for i in range(len(words) - size + 1):
+                key = " ".join(words[i:i + size])
+                if key not in found and (key in self.entity_chunks or key in self.neighbours):
+                    found.append(key)
+        return found
+
+    def expand(self, text: str, per_entity: int, neighbour_limit: int, neighbour_weight: float = 0.5):
+        """
+        Returns [(chunk id, score)] best first: chunks mentioning entities named
+        in text score 1 per entity, chunks of their 1-hop neighbours score
+        neighbour_weight. Each entity contributes at most its per_entity most
+        recent chunks, so the cost stays bounded for hub entities.
+        """
+        scores = defaultdict(float)
+        entities = self.match_entities(text)
+        # islice over the live dict/set (newest chunks first via reversed) so a
+        # lookup never copies a hub entity's whole posting or neighbour set
+        for key in entities:
+            for chunk_id in islice(reversed(self.entity_chunks.get(key, {})), per_entity):
+                scores[chunk_id] += 1.0
+            for neighbour in islice(self.neighbours.get(key, ()), neighbour_limit):
+                if neighbour in entities:
+                    continue
+                for chunk_id in islice(reversed(self.entity_chunks.get(neighbour, {})), per_entity):
+                    scores[chunk_id] += neighbour_weight
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
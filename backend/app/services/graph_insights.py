@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from app.core.config import settings
+from app.services.graph_writer import graph_writer, ENTITY_KINDS
+
+DAY_SECONDS = 86400
+
+# Exact degrees (and per-day counts for windows) from the graph, used to (re)build the index
+DEGREES_QUERY = """
+MATCH (n)-->(r:Recording)
+WHERE n:Person OR n:Company OR n:Topic
+RETURN labels(n)[0] AS type, n.name AS name, toInteger(coalesce(r.created_at, 0) / 86400000) AS day, count(*) AS connections
+"""
+
+def _today() -> int:
+    return int(time.time() // DAY_SECONDS)
+
+class EntityDegreeIndex:
+    """
+    Materialized "most connected entities" for the insights dashboard.
+    Degree counters are bumped as the write-behind queue flushes entity ->
+    Recording edges (each recording is counted once), and a top-N list is
+    maintained alongside them: counts only grow, so an entity can only enter
+    the list by overtaking its smallest member. Reads of the all-time top-N
+    are served from memory without touching the graph; time windows sum the
+    per-day counters of the last INSIGHTS_MAX_WINDOW_DAYS days and are cached
+    until the next write.
+    """
+    def __init__(self, top_n: int):
+        self.top_n = top_n
+        self.degrees = Counter() # (type, name) -> connections
+        self.daily = defaultdict(Counter) # day number -> (type, name) -> connections
+        self.top = [] # [(connections, (type, name))], best first
+        self.ready = False
+        self._counted_sources = set()
+        self._window_cache = {}
+        self._lock = threading.Lock()
+
+    def _bump_top(self, key, count: int):
+        for i, (_, member) in enumerate(self.top):
+            if member == key:
+                self.top[i] = (count, key)
+                break
+        else:
+            if len(self.top) < self.top_n:
+                self.top.append((count, key))
+            elif count > self.top[-1][0]:
+                self.top[-1] = (count, key)
+            else:
+                return
+        self.top.sort(key=lambda item: item[0], reverse=True)
+
+    def _add(self, key, day: int, count: int = 1):
+        self.degrees[key] += count
+        if day:
+            self.daily[day][key] += count
+        self._bump_top(key, self.degrees[key])
+
+    def _prune(self):
+        oldest = _today() - settings.INSIGHTS_MAX_WINDOW_DAYS
+        for day in [day for day in self.daily if day <= oldest]:
+            del self.daily[day]
+
+    def record(self, mutations):
+        """
+        Counts the entity -> Recording edges of flushed (source_id, data) mutations.
+        """
+        day = _today()
+        with self._lock:
+            for source_id, data in mutations:
+                if source_id in self._counted_sources:
+                    continue
+                self._counted_sources.add(source_id)
+                for key, label, _ in ENTITY_KINDS:
+                    for name in set(data.get(key) or []):
+                        if isinstance(name, str) and name:
+                            self._add((label, name), day)
+            self._window_cache = {}
+            self._prune()
+
+    def load(self, rows):
+        """
+        Replaces all counters with exact degrees from DEGREES_QUERY rows.
+        """
+        with self._lock:
+            self.degrees = Counter()
+            self.daily = defaultdict(Counter)
+            self.top = []
+            for row in rows:
+                self._add((row["type"], row["name"]), row["day"], row["connections"])
+            self._window_cache = {}
+            self._prune()
+            self.ready = True
+
+    def top_entities(self, limit: int = 10, window_days: int = None):
+        """
+        [{"type", "name", "connections"}] best first, all-time or over the last window_days days.
+        """
+        if not window_days:
+            ranked = self.top[:limit]
+        else:
+            window_days = min(window_days, settings.INSIGHTS_MAX_WINDOW_DAYS)
+            ranked = self._window_cache.get(window_days)
+            if ranked is None:
+                since = _today() - window_days + 1
+                totals = Counter()
+                for day, counts in list(self.daily.items()):
+                    if day >= since:
+                        totals.update(counts)
+                ranked = [(count, key) for key, count in totals.most_common(self.top_n)]
+                self._window_cache[window_days] = ranked
+            ranked = ranked[:limit]
+        return [{"type": key[0], "name": key[1], "connections": count} for count, key in ranked]
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "entities": len(self.degrees),
+            "days_tracked": len(self.daily),
+            "top_n": self.top_n
+        }
+
+degree_index = EntityDegreeIndex(settings.INSIGHTS_TOP_N)
+graph_writer.add_listener(degree_index.record)
@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError: # Windows: locks only cover this process
+    fcntl = None
+
+class GraphStore:
+    """
+    Durable storage for the in-process RAG graph: a compact snapshot plus an
+    append-only mutation log.
+
+    - snapshot.json: interned node names, node types and relation names, and
+      the name of the current edge file
+    - edges-<generation>.i32: (source, target, relation) int32 triples, memory-mapped on load
+    - graph.log: one JSON line per bulk update {"nodes": [[name, type]], "edges": [[source, target, relation]]}
+
+    Several processes (uvicorn workers) may share the directory. Appends and
+    log rotation hold an exclusive lock on graph.lock; compaction holds
+    compact.lock, so one process compacts at a time and the others skip.
+    Compaction folds the rotated log into the on-disk snapshot (not this
+    process's graph, which lacks other workers' mutations) in a background
+    thread once the log grows past compact_bytes. The log is rotated to
+    graph.log.compacting first, so a crash mid-compaction only means that
+    file is replayed again on the next load.
+    """
+    def __init__(self, directory: str, compact_bytes: int):
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._snapshot_path = os.path.join(directory, "snapshot.json")
+        self._log_path = os.path.join(directory, "graph.log")
+        self._compacting_path = os.path.join(directory, "graph.log.compacting")
+        self._log_lock_path = os.path.join(directory, "graph.lock")
+        self._compact_lock_path = os.path.join(directory, "compact.lock")
+        self._lock = threading.Lock()
+        self._compactor = None
+        self.compactions = 0
+        self.last_load_seconds = 0.0
+
+    @contextmanager
+    def _file_lock(self, path: str, blocking: bool = True):
+        """
+        Exclusive flock on path; yields False instead of waiting if blocking is off and it is held.
+        """
+        with open(path, "a") as f:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load(self):
+        """
+        Yields (nodes, edges) batches that rebuild the graph: the snapshot first, then the log tail.
+        nodes are (name, {"type": ..}) pairs, edges are (source, target, {"relation": ..}) triples.
+        """
+        started = time.perf_counter()
+        # Holding compact.lock keeps another worker from swapping the snapshot mid-read
+        with self._file_lock(self._compact_lock_path):
+            yield from self._read(self._compacting_path, self._log_path)
+        self.last_load_seconds = time.perf_counter() - started
+
+    def _read(self, *log_paths):
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path) as f:
+                snapshot = json.load(f)
+            names = snapshot["nodes"]
+            types = snapshot["types"]
+            relations = snapshot["relations"]
+            nodes = [(name, {"type": types[t]}) for name, t in zip(names, snapshot["node_types"])]
+            edges = []
+            edge_path = os.path.join(self.directory, snapshot["edge_file"])
+            if snapshot["edge_count"]:
+                triples = np.memmap(edge_path, dtype=np.int32, mode="r", shape=(snapshot["edge_count"], 3))
+                edges = [(names[s], names[t], {"relation": relations[r]}) for s, t, r in triples.tolist()]
+                del triples
+            yield nodes, edges
+
+        for path in log_paths:
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break # Torn final line from a crash
+                    yield (
+                        [(name, {"type": node_type}) for name, node_type in entry["nodes"]],
+                        [(source, target, {"relation": relation}) for source, target, relation in entry["edges"]]
+                    )
+
+    def append(self, nodes, edges):
+        """
+        Logs one bulk update (same shapes as load() yields).
+        """
+        entry = {
+            "nodes": [[name, attrs.get("type")] for name, attrs in nodes],
+            "edges": [[source, target, attrs.get("relation")] for source, target, attrs in edges]
+        }
+        with self._lock, self._file_lock(self._log_lock_path):
+            with open(self._log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def log_size(self) -> int:
+        return os.path.getsize(self._log_path) if os.path.exists(self._log_path) else 0
+
+    def maybe_compact(self):
+        """
+        Starts a background compaction if the log is over compact_bytes and none is running.
+        """
+        if self.log_size() < self.compact_bytes:
+            return False
+        if self._compactor is not None and self._compactor.is_alive():
+            return False
+        self.compact(background=True)
+        return True
+
+    def compact(self, background: bool = False):
+        if background:
+            self._compactor = threading.Thread(target=self._compact, daemon=True)
+            self._compactor.start()
+        else:
+            self._compact()
+
+    def _compact(self):
+        with self._file_lock(self._compact_lock_path, blocking=False) as acquired:
+            if not acquired:
+                return # Another worker is compacting
+            # Rotate the log; appends made after this go to a fresh graph.log
+            with self._lock, self._file_lock(self._log_lock_path):
+                if os.path.exists(self._log_path):
+                    if os.path.exists(self._compacting_path):
+                        # Left over from an interrupted compaction; fold the log into it
+                        with open(self._log_path) as src, open(self._compacting_path, "a") as dst:
+                            dst.write(src.read())
+                        os.remove(self._log_path)
+                    else:
+                        os.replace(self._log_path, self._compacting_path)
+
+            # Replay snapshot + rotated log the way networkx.Graph applies them:
+            # later node types win, edges are undirected and keep their last relation
+            node_types = {}
+            relations = {}
+            for nodes, edges in self._read(self._compacting_path):
+                for name, attrs in nodes:
+                    node_types[name] = attrs.get("type")
+                for source, target, attrs in edges:
+                    node_types.setdefault(source, None)
+                    node_types.setdefault(target, None)
+                    key = (target, source) if (target, source) in relations else (source, target)
+                    relations[key] = attrs.get("relation")
+            self._write_snapshot(
+                list(node_types.items()),
+                [(source, target, relation) for (source, target), relation in relations.items()]
+            )
+
+    def _write_snapshot(self, nodes, edges):
+        try:
+            names = [name for name, _ in nodes]
+            ids = {name: i for i, name in enumerate(names)}
+            types = sorted({node_type for _, node_type in nodes}, key=lambda t: (t is None, t or ""))
+            type_ids = {t: i for i, t in enumerate(types)}
+            relations = sorted({relation for _, _, relation in edges}, key=lambda r: (r is None, r or ""))
+            relation_ids = {r: i for i, r in enumerate(relations)}
+
+            generation = time.time_ns()
+            edge_file = f"edges-{generation}.i32"
+            triples = np.array(
+                [(ids[s], ids[t], relation_ids[r]) for s, t, r in edges],
+                dtype=np.int32
+            ).reshape(-1, 3)
+            triples.tofile(os.path.join(self.directory, edge_file))
+
+            snapshot = {
+                "nodes": names,
+                "node_types": [type_ids[node_type] for _, node_type in nodes],
+                "types": types,
+                "relations": relations,
+                "edge_file": edge_file,
+                "edge_count": len(triples)
+            }
+            tmp_path = self._snapshot_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._snapshot_path)
+
+            # The new snapshot covers the rotated log and older edge files
+            if os.path.exists(self._compacting_path):
+                os.remove(self._compacting_path)
+            for name in os.listdir(self.directory):
+                if name.startswith("edges-") and name != edge_file:
+                    os.remove(os.path.join(self.directory, name))
+            self.compactions += 1
+            print(f"RAG graph compacted: {len(names)} nodes, {len(triples)} edges")
+        except Exception as e:
+            print(f"RAG graph compaction failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "log_bytes": self.log_size(),
+            "compactions": self.compactions,
+            "compacting": self._compactor is not None and self._compactor.is_alive(),
+            "last_load_seconds": round(self.last_load_seconds, 4)
+        }
@@ -0,0 +1,205 @@
+import asyncio
+import time
+from app.core.config import settings
+
+# Entity kinds extracted per recording: (data key, node label, relationship to the Recording)
+ENTITY_KINDS = [
+    ("people", "Person", "APPEARED_IN"),
+    ("companies", "Company", "MENTIONED_IN"),
+    ("topics", "Topic", "DISCUSSED_IN")
+]
+
+RECORDINGS_QUERY = """
+UNWIND $ids AS id
+MERGE (r:Recording {id: id})
+ON CREATE SET r.created_at = timestamp()
+"""
+
+# Label and relationship type can't be parameters; they come from ENTITY_KINDS only
+ENTITY_QUERY = """
+UNWIND $rows AS row
+MERGE (n:{label} {{name: row.name}})
+WITH n, row
+MATCH (r:Recording {{id: row.source_id}})
+MERGE (n)-[:{relation}]->(r)
+"""
+
+def build_statements(mutations):
+    """
+    Coalesces queued (source_id, data) mutations into one UNWIND statement per
+    entity kind. Duplicate rows collapse, and rows are sorted so concurrent
+    transactions lock shared nodes in the same order.
+    """
+    recordings = sorted({source_id for source_id, _ in mutations})
+    statements = [(RECORDINGS_QUERY, {"ids": recordings})]
+    for key, label, relation in ENTITY_KINDS:
+        rows = sorted({
+            (name, source_id)
+            for source_id, data in mutations
+            for name in data.get(key) or []
+            if isinstance(name, str) and name
+        })
+        if rows:
+            statements.append((
+                ENTITY_QUERY.format(label=label, relation=relation),
+                {"rows": [{"name": name, "source_id": source_id} for name, source_id in rows]}
+            ))
+    return statements
+
+class InMemoryGraphRunner:
+    """
+    Stand-in for the Neo4j connection: records each flushed transaction
+    (a list of (query, params)) instead of sending it, so batching can be
+    checked without a server.
+    """
+    def __init__(self):
+        self.transactions = []
+
+    async def run_transaction(self, statements):
+        self.transactions.append(list(statements))
+
+class GraphWriteQueue:
+    """
+    Write-behind queue for knowledge-graph updates. Producers enqueue
+    per-recording mutations and return immediately; a single flusher drains
+    up to GRAPH_WRITE_BATCH_SIZE of them (waiting at most
+    GRAPH_WRITE_FLUSH_INTERVAL_SECONDS for a batch to fill), coalesces them
+    into UNWIND statements and runs those in one write transaction.
+    The queue holds at most GRAPH_WRITE_MAX_PENDING mutations; beyond that,
+    submit() waits (backpressure).
+    """
+    def __init__(self, runner=None, max_pending: int = None, batch_size: int = None, flush_interval: float = None):
+        self.runner = runner
+        self.max_pending = max_pending or settings.GRAPH_WRITE_MAX_PENDING
+        self.batch_size = batch_size or settings.GRAPH_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.GRAPH_WRITE_FLUSH_INTERVAL_SECONDS
+        self._queue = None
+        self._task = None
+        # Bumped after every successful flush; read caches compare against it
+        self.version = 0
+        # Called with each successfully written batch of (source_id, data)
+        self._listeners = []
+
+        self.submitted = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed_flushes = 0
+        self.max_batch = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.backpressure_waits = 0
+
+    def _get_runner(self):
+        if self.runner is None:
+            from app.db.neo4j import neo4j_conn
+            self.runner = neo4j_conn
+        return self.runner
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        """
+        Flushes what is queued, then stops the flusher.
+        """
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, source_id: str, data: dict):
+        """
+        Queues one recording's entities; waits while the queue is full.
+        """
+        self.start()
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put((source_id, data))
+        self.submitted += 1
+
+    async def flush(self):
+        """
+        Waits until everything submitted so far has been written (or dropped).
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _flusher(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch):
+        statements = build_statements(batch)
+        for attempt in range(settings.GRAPH_WRITE_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                await self._get_runner().run_transaction(statements)
+            except Exception as e:
+                self.failed_flushes += 1
+                if attempt < settings.GRAPH_WRITE_RETRIES:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                self.dropped += len(batch)
+                print(f"Graph write of {len(batch)} recordings failed, dropping: {e}")
+                return
+            elapsed = time.perf_counter() - started
+            self.version += 1
+            self.batches += 1
+            self.flushed += len(batch)
+            self.max_batch = max(self.max_batch, len(batch))
+            self.last_flush_seconds = elapsed
+            self.total_flush_seconds += elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            for listener in self._listeners:
+                try:
+                    listener(batch)
+                except Exception as e:
+                    print(f"Graph write listener failed: {e}")
+            return
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failed_flushes": self.failed_flushes,
+            "avg_batch_size": round(self.flushed / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+            "avg_flush_seconds": round(self.total_flush_seconds / self.batches, 4) if self.batches else 0.0,
+            "max_flush_seconds": round(self.max_flush_seconds, 4),
+            "backpressure_waits": self.backpressure_waits
+        }
+
+graph_writer = GraphWriteQueue()
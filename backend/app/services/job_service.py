@@ -0,0 +1,325 @@
+import asyncio
+import datetime
+import json
+import uuid
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.models import Job, Meeting, Insight
+from app.services.transcription_service import transcription_service
+from app.services.analysis_service import analysis_service
+from app.services.csv_export_service import csv_export_service
+from app.services.rate_limiter import current_priority
+
+# Pipeline stages in execution order. "save" happens on the request path,
+# everything after it runs on a background worker.
+STAGES = ["save", "transcribe", "analyze", "export", "persist"]
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat()
+
+class JobService:
+    """
+    Runs the upload pipeline (transcribe -> analyze -> export -> persist) on a
+    bounded pool of background workers. Job state lives in the `jobs` table so
+    queued or interrupted work is picked up again after a restart.
+    """
+    def __init__(self):
+        self.queue = None
+        self.workers = []
+
+    async def start(self, concurrency: int = None):
+        if self.workers:
+            return
+
+        self.queue = asyncio.Queue()
+        concurrency = concurrency or settings.JOB_WORKERS
+
+        # Re-enqueue anything left over from a previous run. Jobs that were
+        # mid-flight are restarted from the transcription stage.
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Job).where(Job.status.in_(["queued", "running"])).order_by(Job.created_at)
+            )
+            pending = result.scalars().all()
+            for job in pending:
+                job.status = "queued"
+            await db.commit()
+
+        for job in pending:
+            self.queue.put_nowait(job.id)
+        if pending:
+            print(f"Re-queued {len(pending)} pending job(s)")
+
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(concurrency)]
+        print(f"Started {concurrency} job worker(s)")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def submit(self, db: AsyncSession, filename: str, file_path: str,
+                     transcription_method: str = "gemini", llm_model: str = None,
+                     content_hash: str = None) -> Job:
+        """
+        Records a new job for an already saved upload and queues it.
+        If the same content was already analysed (or is being analysed) with the
+        same transcription method and model, that work is reused instead.
+        """
+        llm_model = llm_model or settings.DEFAULT_MODEL
+
+        if content_hash:
+            existing = await self.find_existing(db, filename, file_path, content_hash, transcription_method, llm_model)
+            if existing:
+                return existing
+
+        stages = {name: {"status": "pending"} for name in STAGES}
+        stages["save"] = {"status": "completed", "finished_at": _now()}
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            status="queued",
+            stage="save",
+            stages=json.dumps(stages),
+            filename=filename,
+            file_path=str(file_path),
+            content_hash=content_hash,
+            transcription_method=transcription_method,
+            llm_model=llm_model
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        # If the workers aren't running yet, the job is picked up on start()
+        if self.queue is not None:
+            self.queue.put_nowait(job.id)
+        return job
+
+    async def find_existing(self, db: AsyncSession, filename: str, file_path: str, content_hash: str,
+                            transcription_method: str, llm_model: str):
+        """
+        Returns a job for content that needs no new processing: either an
+        in-flight job for the same upload, or a new already-completed job
+        pointing at the Meeting from a previous analysis. None otherwise.
+        """
+        result = await db.execute(
+            select(Job).where(
+                Job.content_hash == content_hash,
+                Job.transcription_method == transcription_method,
+                Job.llm_model == llm_model,
+                Job.status.in_(["queued", "running"])
+            ).order_by(Job.created_at.desc())
+        )
+        in_flight = result.scalars().first()
+        if in_flight:
+            print(f"Upload matches in-flight job {in_flight.id}")
+            return in_flight
+
+        result = await db.execute(
+            select(Meeting).where(
+                Meeting.content_hash == content_hash,
+                Meeting.transcription_method == transcription_method,
+                Meeting.llm_model == llm_model
+            ).order_by(Meeting.id.desc())
+        )
+        meeting = result.scalars().first()
+        if not meeting:
+            return None
+
+        # Reuse the stored analysis (domain, csv path) of the job that created the meeting
+        result = await db.execute(
+            select(Job).where(Job.meeting_id == meeting.id, Job.status == "completed", Job.result.isnot(None))
+            .order_by(Job.created_at)
+        )
+        source_job = result.scalars().first()
+        if source_job:
+            job_result = source_job.result
+        else:
+            try:
+                report = json.loads(meeting.summary_text) if meeting.summary_text else {}
+            except json.JSONDecodeError:
+                report = meeting.summary_text
+            job_result = json.dumps({"analysis": {"domain": "General", "report": report}, "csv_path": None})
+
+        now = _now()
+        stages = {name: {"status": "completed", "finished_at": now, "reused": name != "save"} for name in STAGES}
+        job = Job(
+            id=uuid.uuid4().hex,
+            status="completed",
+            stage="persist",
+            stages=json.dumps(stages),
+            filename=filename,
+            file_path=str(file_path),
+            content_hash=content_hash,
+            transcription_method=transcription_method,
+            llm_model=llm_model,
+            meeting_id=meeting.id,
+            result=job_result
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        print(f"Upload matches meeting {meeting.id}, reusing its transcript and report")
+        return job
+
+    async def get_job(self, db: AsyncSession, job_id: str):
+        result = await db.execute(select(Job).where(Job.id == job_id))
+        return result.scalars().first()
+
+    def describe(self, job: Job) -> dict:
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "stage": job.stage,
+            "stages": json.loads(job.stages) if job.stages else {},
+            "filename": job.filename,
+            "meeting_id": job.meeting_id,
+            "error": job.error,
+            "created_at": job.created_at,
+            "updated_at": job.updated_at
+        }
+
+    async def _worker(self, index: int):
+        # Uploads yield provider capacity to interactive requests
+        current_priority.set("batch")
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # _run records failures itself, this only guards the worker loop
+                print(f"Job worker {index} error on {job_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _update(self, job_id: str, **fields):
+        async with AsyncSessionLocal() as db:
+            job = await self.get_job(db, job_id)
+            if not job:
+                return
+            for key, value in fields.items():
+                setattr(job, key, value)
+            await db.commit()
+
+    async def _set_stage(self, job_id: str, stage: str, **state):
+        async with AsyncSessionLocal() as db:
+            job = await self.get_job(db, job_id)
+            if not job:
+                return
+            stages = json.loads(job.stages) if job.stages else {}
+            stages.setdefault(stage, {}).update(state)
+            job.stages = json.dumps(stages)
+            job.stage = stage
+            await db.commit()
+
+    @asynccontextmanager
+    async def _stage(self, job_id: str, stage: str):
+        await self._set_stage(job_id, stage, status="running", started_at=_now())
+        try:
+            yield
+        except Exception as e:
+            await self._set_stage(job_id, stage, status="failed", finished_at=_now(), error=str(e))
+            raise
+        await self._set_stage(job_id, stage, status="completed", finished_at=_now())
+
+    async def _run(self, job_id: str):
+        async with AsyncSessionLocal() as db:
+            job = await self.get_job(db, job_id)
+            if not job or job.status not in ("queued", "running"):
+                return
+            filename = job.filename
+            file_path = job.file_path
+            content_hash = job.content_hash
+            transcription_method = job.transcription_method or "gemini"
+            llm_model = job.llm_model
+
+        await self._update(job_id, status="running", error=None)
+        print(f"Job {job_id}: processing {filename}")
+
+        try:
+            async with self._stage(job_id, "transcribe"):
+                print(f"Job {job_id}: transcribing video using {transcription_method}...")
+                transcript = await transcription_service.transcribe_video(file_path, method=transcription_method)
+                print(f"Job {job_id}: transcription complete. Length: {len(transcript)} characters")
+
+            async with self._stage(job_id, "analyze"):
+                print(f"Job {job_id}: analyzing transcript using model {llm_model or 'default'}...")
+                analysis_result = await analysis_service.analyze_video_transcript(transcript, filename, llm_model=llm_model)
+                print(f"Job {job_id}: analysis complete. Domain: {analysis_result.get('domain', 'unknown')}")
+
+            async with self._stage(job_id, "export"):
+                csv_path = csv_export_service.export_report_to_csv(
+                    analysis_result["report"],
+                    filename.replace('.', '_')
+                )
+                print(f"Job {job_id}: CSV exported to: {csv_path}")
+
+            async with self._stage(job_id, "persist"):
+                async with AsyncSessionLocal() as db:
+                    meeting = await self.persist_meeting(
+                        db, filename, file_path, transcript, analysis_result.get("report", {}),
+                        content_hash=content_hash,
+                        transcription_method=transcription_method,
+                        llm_model=llm_model
+                    )
+                print(f"Job {job_id}: meeting saved with ID: {meeting.id}")
+
+            await self._update(
+                job_id,
+                status="completed",
+                meeting_id=meeting.id,
+                result=json.dumps({"analysis": analysis_result, "csv_path": csv_path})
+            )
+        except Exception as e:
+            import traceback
+            print(f"Job {job_id} failed: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+            await self._update(job_id, status="failed", error=str(e))
+
+    async def persist_meeting(self, db: AsyncSession, filename: str, file_path: str,
+                              transcript: str, report_data, content_hash: str = None,
+                              transcription_method: str = None, llm_model: str = None) -> Meeting:
+        """
+        Stores the meeting and one Insight row per report list item / text field.
+        """
+        new_meeting = Meeting(
+            title=filename,
+            transcript_text=transcript,
+            summary_text=json.dumps(report_data) if isinstance(report_data, dict) else str(report_data),
+            file_path=str(file_path),
+            content_hash=content_hash,
+            transcription_method=transcription_method,
+            llm_model=llm_model
+        )
+        db.add(new_meeting)
+        await db.flush() # flush to get ID
+
+        # Assuming report_data has keys that are lists, we can treat them as insight types
+        if isinstance(report_data, dict):
+            for key, value in report_data.items():
+                if isinstance(value, list):
+                    for item in value:
+                        db.add(Insight(
+                            meeting_id=new_meeting.id,
+                            insight_type=key,
+                            content=str(item)
+                        ))
+                elif isinstance(value, str) and key.lower() not in ["summary", "title"]:
+                    db.add(Insight(
+                        meeting_id=new_meeting.id,
+                        insight_type=key,
+                        content=value
+                    ))
+
+        await db.commit()
+        await db.refresh(new_meeting)
+        return new_meeting
+
+job_service = JobService()
@@ -0,0 +1,95 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from app.services.vector_store import matches_where
+
+# Words, product codes (ABC-123, v2.1) and numbers (1,000 / 3.5) stay whole
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_.,][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by do for from has have he i if in is it its me my no not of on or our so
+that the their them there they this to was we were what when which who will with you your
+""".split())
+
+def tokenize(text: str):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+class BM25Index:
+    """
+    In-memory inverted index scored with Okapi BM25. Documents are added
+    incrementally (postings, lengths and document frequencies are updated in
+    place), so indexing a new chunk costs only its own tokens.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.metadatas = []
+        self.lengths = []
+        self.total_length = 0
+        # term -> {doc row: term frequency}
+        self.postings = defaultdict(dict)
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def add(self, ids, documents, metadatas=None):
+        metadatas = metadatas or [{}] * len(ids)
+        with self._lock:
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                if chunk_id in self._rows:
+                    continue
+                row = len(self.ids)
+                terms = Counter(tokenize(document or ""))
+                for term, freq in terms.items():
+                    self.postings[term][row] = freq
+                length = sum(terms.values())
+                self._rows[chunk_id] = row
+                self.ids.append(chunk_id)
+                self.metadatas.append(metadata or {})
+                self.lengths.append(length)
+                self.total_length += length
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, n_results: int = 5, where: dict = None):
+        """
+        Returns [(chunk id, score)] for the best n_results chunks matching any query term.
+        """
+        # Runs in a worker thread while add() may run on the event loop: copy the
+        # postings it needs under the lock (lists are append-only, so rows < n stay valid)
+        with self._lock:
+            n = len(self.ids)
+            total_length = self.total_length
+            term_postings = [dict(self.postings[term]) for term in set(tokenize(query)) if term in self.postings]
+        if not n:
+            return []
+        avg_length = total_length / n or 1
+        scores = defaultdict(float)
+        for postings in term_postings:
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, freq in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[row] / avg_length)
+                scores[row] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for row, score in ranked:
+            if where and not matches_where(self.metadatas[row], where):
+                continue
+            results.append((self.ids[row], score))
+            if len(results) >= n_results:
+                break
+        return results
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """
+    Merges ranked lists of ids: each id scores sum(1 / (k + rank)) over the lists it appears in.
+    Returns [(id, score)] best first.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,38 +1,142 @@
 import json
-from app.db.neo4j import get_neo4j_session, neo4j_conn
+import asyncio
+from app.core.config import settings
+from app.db.neo4j import neo4j_conn
+from app.services.graph_writer import graph_writer, ENTITY_KINDS
+from app.services.entity_canonicalizer import entity_canonicalizer
+from app.services.cypher_cache import cypher_cache, parameterize, validate_cypher
+from app.services.graph_insights import degree_index, DEGREES_QUERY
 from app.services.llm_factory import llm_factory
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from app.services.text_chunker import split_into_segments
+
+# Prompts are built once; chains are compiled once per model via llm_factory.get_chain
+EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a knowledge graph extractor. Extract entities from the transcript. Return STRICT JSON object with keys: people, companies, topics."),
+    ("user", "Transcript: {transcript}")
+])
+
+CYPHER_PROMPT = ChatPromptTemplate.from_template(
+    "Convert to Cypher. Schema: (Person {{name}}), (Company {{name}}), (Topic {{name}}), (Recording {{id}}). "
+    "Relations: (Person)-[:APPEARED_IN]->(Recording), (Company)-[:MENTIONED_IN]->(Recording), (Topic)-[:DISCUSSED_IN]->(Recording). "
+    "Question: {question}. {parameters}Return ONLY a read-only Cypher query, no markdown."
+)
+
+PARAMETER_KINDS = {
+    "Person": "a Person name",
+    "Company": "a Company name",
+    "Topic": "a Topic name",
+    "value": "a string value",
+    "number": "a number"
+}
+
+# Uniqueness constraints (each backed by an index) so every MERGE is an index lookup
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT recording_id IF NOT EXISTS FOR (r:Recording) REQUIRE r.id IS UNIQUE",
+    "CREATE CONSTRAINT person_name IF NOT EXISTS FOR (p:Person) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT company_name IF NOT EXISTS FOR (c:Company) REQUIRE c.name IS UNIQUE",
+    "CREATE CONSTRAINT topic_name IF NOT EXISTS FOR (t:Topic) REQUIRE t.name IS UNIQUE"
+]
 
 class KnowledgeGraphService:
+    def __init__(self):
+        self._setup_lock = None
+        self._setup_generation = 0
+        self._refresher = None
+
+    async def initialize(self):
+        """
+        Creates constraints/indexes, seeds the alias index with the entity
+        names already in the graph and loads the degree index. If Neo4j is
+        offline at startup, this runs once the circuit breaker's probe
+        reconnects (and again after later reconnects, since the server may
+        have been replaced or written to meanwhile).
+        """
+        neo4j_conn.add_connect_listener(self._setup)
+        # Materialized entity degrees, rebuilt periodically to correct drift;
+        # the refresher skips rounds while Neo4j is down
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._insights_refresher())
+        if await neo4j_conn.available():
+            await self._setup()
+        else:
+            print("Neo4j not connected. Graph setup will run once it is reachable.")
+
+    async def _setup(self):
+        if self._setup_lock is None:
+            self._setup_lock = asyncio.Lock()
+        async with self._setup_lock:
+            # The connect listener and initialize() may both fire for one connection
+            if self._setup_generation == neo4j_conn.generation:
+                return
+            generation = neo4j_conn.generation
+            for statement in SCHEMA_STATEMENTS:
+                try:
+                    await neo4j_conn.run(statement, write=True)
+                except Exception as e:
+                    # e.g. existing duplicate names; MERGE still works, just without the index
+                    print(f"Neo4j schema statement failed ({statement}): {e}")
+            for _, label, _ in ENTITY_KINDS:
+                try:
+                    rows = await neo4j_conn.run(f"MATCH (n:{label}) RETURN n.name AS name")
+                    entity_canonicalizer.seed(label, [row["name"] for row in rows if row["name"]])
+                except Exception as e:
+                    print(f"Failed to load {label} names: {e}")
+            await self.refresh_insights()
+            self._setup_generation = generation
+
+    async def refresh_insights(self):
+        """
+        Rebuilds the in-memory degree index from the graph (one full aggregation).
+        """
+        try:
+            degree_index.load(await neo4j_conn.run(DEGREES_QUERY, timeout=settings.NEO4J_QUERY_TIMEOUT_SECONDS * 4))
+        except Exception as e:
+            print(f"Failed to load entity degrees: {e}")
+
+    async def _insights_refresher(self):
+        while True:
+            await asyncio.sleep(settings.INSIGHTS_REBUILD_SECONDS)
+            if await neo4j_conn.available():
+                await self.refresh_insights()
+
     async def process_transcript_for_graph(self, transcript: str, source_id: str):
         """
         Extracts strategic entities and updates graph if connected.
         """
         # 0. Check connection first
-        session = neo4j_conn.get_session()
-        if not session:
+        if not await neo4j_conn.available():
             print("Neo4j not connected. Skipping graph extraction.")
             return {}
-        session.close()
 
         # 1. LangChain Extraction
-        llm = llm_factory.get_llm()
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a knowledge graph extractor. Extract entities from the transcript. Return STRICT JSON object with keys: people, companies, topics."),
-            ("user", "Transcript: {transcript}")
-        ])
-        
-        chain = prompt | llm | JsonOutputParser()
-        
+        chain = llm_factory.get_chain("graph_extraction", lambda llm: EXTRACTION_PROMPT | llm | JsonOutputParser())
+
+        # Long transcripts are extracted segment by segment (in parallel) instead of truncated
+        segments = split_into_segments(transcript, settings.ANALYSIS_SEGMENT_TOKENS)
+        semaphore = asyncio.Semaphore(max(1, settings.ANALYSIS_CONCURRENCY))
+
+        async def extract(segment: str):
+            async with semaphore:
+                try:
+                    return await chain.ainvoke({"transcript": segment})
+                except Exception as e:
+                    print(f"Graph extraction failed for segment: {e}")
+                    return None
+
+        partials = [p for p in await asyncio.gather(*[extract(seg) for seg in segments]) if isinstance(p, dict)]
+        if not partials:
+            return {}
+
         try:
-            data = await chain.ainvoke({"transcript": transcript[:15000]})
-            # Clean data ensures keys exist
-            data.setdefault("people", [])
-            data.setdefault("companies", [])
-            data.setdefault("topics", [])
-            
+            # Union of entities across segments, mapped to canonical names
+            # ("ACME Inc." -> "Acme"); also ensures keys exist
+            data = {}
+            for key, label, _ in ENTITY_KINDS:
+                names = [name for partial in partials for name in partial.get(key) or []]
+                data[key] = entity_canonicalizer.canonicalize(label, names)
+
             await self._update_graph(data, source_id)
             return data
         except Exception as e:
@@ -40,53 +144,60 @@ class KnowledgeGraphService:
             return {}
 
     async def _update_graph(self, data, source_id):
-        query = """
-        MERGE (r:Recording {id: $source_id})
-        
-        FOREACH (p_name IN $data.people | 
-            MERGE (p:Person {name: p_name})
-            MERGE (p)-[:APPEARED_IN]->(r)
-        )
-        FOREACH (c_name IN $data.companies | 
-            MERGE (c:Company {name: c_name})
-            MERGE (c)-[:MENTIONED_IN]->(r)
-        )
-        FOREACH (t_name IN $data.topics | 
-            MERGE (t:Topic {name: t_name})
-            MERGE (t)-[:DISCUSSED_IN]->(r)
-        )
         """
-        # Use sync driver in async context cautiously or offload to thread in real prod
-        # Here we just run it.
-        try:
-            with neo4j_conn.get_session() as session:
-                if session:
-                    session.run(query, source_id=source_id, data=data)
-        except Exception as e:
-            print(f"Neo4j Write Error: {e}")
+        Hands the recording's entities to the write-behind queue, which
+        coalesces them with other recordings into batched UNWIND writes.
+        """
+        await graph_writer.submit(source_id, data)
+
+    async def _translate(self, template: str, prompt: str, kinds: dict, use_cache: bool):
+        """
+        Cypher for a parameterized question, from the plan cache (keyed on the
+        normalised template) or the LLM (given the original-case prompt).
+        """
+        if use_cache:
+            cypher = cypher_cache.get_plan(template, kinds)
+            if cypher:
+                return cypher, True
 
-    async def query_graph(self, natural_query: str):
+        parameters = ""
+        if kinds:
+            described = ", ".join(f"${name} ({PARAMETER_KINDS[kind]})" for name, kind in kinds.items())
+            parameters = f"Use the query parameters {described} instead of literal values. "
+        chain = llm_factory.get_chain("cypher", lambda llm: CYPHER_PROMPT | llm, use_cache=use_cache)
+        cypher_response = await chain.ainvoke({"question": prompt, "parameters": parameters})
+        return cypher_response.content.replace("```cypher", "").replace("```", "").strip(), False
+
+    async def query_graph(self, natural_query: str, use_cache: bool = True):
         # 0. Check connection
-        if not neo4j_conn.get_session():
+        if not await neo4j_conn.available():
             return [{"error": "Graph database disconnected", "status": "offline"}]
 
-        # 1. Generate Cypher
-        llm = llm_factory.get_llm()
-        prompt = ChatPromptTemplate.from_template(
-            "Convert to Cypher. Schema: (Person, Company, Topic, Recording). Relations: APPEARED_IN, MENTIONED_IN. Question: {question}. Return ONLY Cypher query, no markdown."
-        )
-        chain = prompt | llm
-        cypher_response = await chain.ainvoke({"question": natural_query})
-        cypher = cypher_response.content.replace("```cypher", "").replace("```", "").strip()
+        # 1. Generate Cypher: known entities, quoted strings and numbers become
+        # parameters, so questions differing only in them share one cached plan
+        template, prompt, params, kinds = parameterize(natural_query, entity_canonicalizer)
+        cypher, cached_plan = await self._translate(template, prompt, kinds, use_cache)
+        error = validate_cypher(cypher, params)
+        if error:
+            return [{"error": error, "query": cypher}]
+
+        if use_cache:
+            results = cypher_cache.get_result(cypher, params, graph_writer.version)
+            if results is not None:
+                return results
 
         # 2. Execute
         try:
-            results = []
-            with neo4j_conn.get_session() as session:
-                result = session.run(cypher)
-                results = [record.data() for record in result]
-            return results
+            # Read-mode session: generated Cypher can't write
+            version = graph_writer.version
+            results = await neo4j_conn.run(cypher, params)
         except Exception as e:
             return [{"error": str(e), "query": cypher}]
 
+        # Only plans that ran successfully are reused
+        if not cached_plan:
+            cypher_cache.put_plan(template, kinds, cypher)
+        cypher_cache.put_result(cypher, params, version, results)
+        return results
+
 knowledge_graph_service = KnowledgeGraphService()
@@ -1,53 +1,137 @@
+import threading
+import httpx
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_groq import ChatGroq
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable
 from app.core.config import settings
+from app.services.llm_cache import llm_cache
+from app.services.rate_limiter import rate_governor
 
 class LLMFactory:
-    def get_llm(self, model_name: str = None) -> BaseChatModel:
+    """
+    Hands out long-lived chat model clients, one per (provider, model,
+    temperature, cache) combination, so requests reuse the client and its
+    keep-alive connections instead of paying construction and TLS setup.
+    Chains built on top of those clients are compiled once and reused too.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._chains = {}
+        self._http_client = None
+        self._http_async_client = None
+
+    def reset(self):
         """
-        Returns a LangChain ChatModel based on configuration.
+        Drops pooled clients and chains (e.g. after API keys or the default model change).
+        """
+        with self._lock:
+            self._clients = {}
+            self._chains = {}
+
+    def _http_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SECONDS
+        )
+
+    def _groq_http_clients(self):
+        # Shared by every Groq client, so all models draw on one keep-alive pool
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self._http_limits())
+            self._http_async_client = httpx.AsyncClient(limits=self._http_limits())
+        return self._http_client, self._http_async_client
+
+    def _resolve(self, model_name: str = None):
+        """
+        Returns (provider, model) for the requested model, applying key-based fallbacks.
         """
         # Determine model
         effective_model = model_name or settings.DEFAULT_MODEL
-        
-        # Lazy fallback logic
-        use_gemini = False
-        
+
         # If user explicitly asks for Gemini, try to use it
         if "gemini" in effective_model:
-            use_gemini = True
+            if not settings.GOOGLE_API_KEY and settings.GROQ_API_KEY:
+                # No Google key, try Groq as last resort
+                return "groq", "llama3-8b-8192" # Safe default for Groq
+            return "gemini", effective_model
+
         # If user asks for something else (e.g. default 'openai' string which maps to Groq usually)
         # Check if Groq key is actually present
-        elif not settings.GROQ_API_KEY:
-            # No Groq key, force Gemini if available
-            if settings.GOOGLE_API_KEY:
-                use_gemini = True
-                effective_model = "gemini-pro" # Fallback model
-            else:
-                # No keys at all? Let it fail or raise
-                pass
-
-        if use_gemini:
-            if not settings.GOOGLE_API_KEY:
-                # If we ended up here but have no Google key, try Groq as last resort
-                if settings.GROQ_API_KEY:
-                     return ChatGroq(
-                        groq_api_key=settings.GROQ_API_KEY,
-                        model_name="llama3-8b-8192", # Safe default for Groq
-                        temperature=0
-                    )
-            
+        if not settings.GROQ_API_KEY and settings.GOOGLE_API_KEY:
+            # No Groq key, force Gemini
+            return "gemini", "gemini-pro" # Fallback model
+
+        # No keys at all? Let it fail on first call
+        return "groq", effective_model
+
+    def _build(self, provider: str, model: str, temperature, cache) -> BaseChatModel:
+        # Every client of a (provider, model) shares one rate limiter; the callback
+        # reports token usage and 429s back to it
+        governed = {
+            "rate_limiter": rate_governor.rate_limiter(provider, model),
+            "callbacks": rate_governor.callbacks(provider, model)
+        }
+        if provider == "gemini":
+            kwargs = {"temperature": temperature} if temperature is not None else {}
             return ChatGoogleGenerativeAI(
-                model=effective_model,
+                model=model,
                 google_api_key=settings.GOOGLE_API_KEY,
-                convert_system_message_to_human=True 
-            )
-        else:
-            return ChatGroq(
-                groq_api_key=settings.GROQ_API_KEY,
-                model_name=effective_model,
-                temperature=0
+                convert_system_message_to_human=True,
+                cache=cache,
+                **governed,
+                **kwargs
             )
 
+        http_client, http_async_client = self._groq_http_clients()
+        return ChatGroq(
+            groq_api_key=settings.GROQ_API_KEY,
+            model_name=model,
+            temperature=temperature if temperature is not None else 0,
+            cache=cache,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **governed
+        )
+
+    def _key(self, model_name: str, use_cache: bool):
+        provider, model = self._resolve(model_name)
+        # Groq has always run at temperature 0; Gemini keeps its provider default
+        temperature = 0 if provider == "groq" else None
+        return provider, model, temperature, bool(use_cache and llm_cache is not None)
+
+    def get_llm(self, model_name: str = None, use_cache: bool = True) -> BaseChatModel:
+        """
+        Returns a LangChain ChatModel based on configuration.
+        Responses go through the persistent LLM cache unless use_cache is False.
+        """
+        key = self._key(model_name, use_cache)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    provider, model, temperature, cached = key
+                    client = self._build(provider, model, temperature, llm_cache if cached else False)
+                    self._clients[key] = client
+        return client
+
+    def get_chain(self, name: str, build, model_name: str = None, use_cache: bool = True) -> Runnable:
+        """
+        Returns the chain `name` compiled for the given model, building it once
+        with build(llm) and reusing it afterwards.
+        """
+        key = (name, self._key(model_name, use_cache))
+        chain = self._chains.get(key)
+        if chain is None:
+            llm = self.get_llm(model_name, use_cache=use_cache)
+            with self._lock:
+                chain = self._chains.get(key)
+                if chain is None:
+                    chain = build(llm)
+                    self._chains[key] = chain
+        return chain
+
 llm_factory = LLMFactory()
@@ -1,6 +1,12 @@
+import asyncio
 from google import genai
 from google.genai import types
 from app.core.config import settings
+from app.services.rate_limiter import rate_governor
+from app.services.text_chunker import estimate_tokens
+from app.services.embedding_cache import embedding_cache
+
+EMBEDDING_MODEL = "text-embedding-004"
 
 class LLMService:
     def __init__(self):
@@ -10,20 +16,57 @@ class LLMService:
         """
         Get embeddings for a text.
         """
-        response = self.client.models.embed_content(
-            model="text-embedding-004",
-            contents=text
-        )
-        return response.embeddings[0].values
+        embeddings = await self.get_embeddings_batch([text])
+        return embeddings[0]
+
+    async def get_embeddings_batch(self, texts: list, batch_size: int = None):
+        """
+        Get embeddings for many texts, in order. Texts already in the embedding
+        cache are served from it; the rest (de-duplicated) are sent
+        EMBEDDING_BATCH_SIZE per embed_content request with up to
+        EMBEDDING_CONCURRENCY requests in flight, through the SDK's async
+        client so the event loop isn't blocked.
+        """
+        if embedding_cache is not None:
+            results = embedding_cache.get_many(EMBEDDING_MODEL, texts)
+        else:
+            results = [None] * len(texts)
+
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+        if not missing:
+            return results
+
+        batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, settings.EMBEDDING_CONCURRENCY))
+
+        async def embed(batch):
+            tokens = sum(estimate_tokens(text) for text in batch)
+            async with semaphore:
+                async with rate_governor.limit("gemini", EMBEDDING_MODEL, tokens=tokens):
+                    response = await self.client.aio.models.embed_content(
+                        model=EMBEDDING_MODEL,
+                        contents=batch
+                    )
+            return [embedding.values for embedding in response.embeddings]
+
+        batch_results = await asyncio.gather(*[embed(batch) for batch in batches])
+        fresh = [values for batch_values in batch_results for values in batch_values]
+        if embedding_cache is not None:
+            embedding_cache.put_many(EMBEDDING_MODEL, missing, fresh)
+
+        by_text = dict(zip(missing, fresh))
+        return [vector if vector is not None else by_text[text] for text, vector in zip(texts, results)]
 
     async def generate_content(self, prompt: str, model: str = "gemini-2.0-flash"):
         """
         Generate content from text prompt.
         """
-        response = self.client.models.generate_content(
-            model=model,
-            contents=prompt
-        )
+        async with rate_governor.limit("gemini", model, tokens=estimate_tokens(prompt)):
+            response = await self.client.aio.models.generate_content(
+                model=model,
+                contents=prompt
+            )
         return response.text
 
     async def generate_json(self, prompt: str, schema: dict = None, model: str = "gemini-2.0-flash"):
@@ -38,11 +81,12 @@ class LLMService:
         # response = self.client.models.generate_content(model=model, contents=prompt, config=config)
         
         config = types.GenerateContentConfig(response_mime_type="application/json")
-        response = self.client.models.generate_content(
-            model=model,
-            contents=prompt,
-            config=config
-        )
+        async with rate_governor.limit("gemini", model, tokens=estimate_tokens(prompt)):
+            response = await self.client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=config
+            )
         return response.text
 
 llm_service = LLMService()
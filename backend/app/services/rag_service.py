@@ -1,94 +1,239 @@
-import chromadb
+import asyncio
+import threading
 import networkx as nx
+from app.core.config import settings
 from app.services.llm_service import llm_service
+from app.services.vector_store import create_vector_store, matches_where
+from app.services.keyword_index import BM25Index, reciprocal_rank_fusion
+from app.services.text_chunker import iter_chunks
+from app.services.graph_index import EntityIndex
+from app.services.graph_store import GraphStore
 import json
 import uuid
 
 class RAGService:
     def __init__(self):
-        # Initialize ChromaDB (Persistent or In-Memory)
-        self.chroma_client = chromadb.Client() # In-memory for now
-        self.collection = self.chroma_client.create_collection(name="transcripts")
+        # Initialize vector backend (Chroma persistent/in-memory, or the embedded NumPy index)
+        self.vector_store = create_vector_store()
+        print(f"Vector store ({settings.VECTOR_BACKEND}) ready with {self.vector_store.count()} chunks")
+
+        # Keyword (BM25) index over the same chunks. Rebuilding it from the stored
+        # documents takes seconds for large stores, so it is filled on the first
+        # keyword search (in a worker thread) instead of at import
+        self.keyword_index = BM25Index()
+        self._keyword_loaded = False
+        self._keyword_lock = threading.Lock()
         
-        # Initialize Graph
+        # Initialize Graph, plus the entity -> chunk / neighbour lookups used at query time,
+        # restored from the last snapshot and mutation log
         self.graph = nx.Graph()
+        self.entity_index = EntityIndex()
+        self.graph_store = GraphStore(settings.RAG_GRAPH_DIR, compact_bytes=settings.RAG_GRAPH_COMPACT_BYTES)
+        for nodes, edges in self.graph_store.load():
+            self._apply_graph_update(nodes, edges)
+        print(
+            f"RAG graph restored: {self.graph.number_of_nodes()} nodes, {self.graph.number_of_edges()} edges "
+            f"in {self.graph_store.last_load_seconds * 1000:.0f}ms"
+        )
+
+    def _apply_graph_update(self, nodes: list, edges: list):
+        """
+        Bulk-applies nodes [(name, attrs)] and edges [(source, target, attrs)] to the graph and entity index.
+        """
+        self.graph.add_nodes_from(nodes)
+        self.graph.add_edges_from(edges)
+
+        mentions = []
+        related = []
+        for source, target, attrs in edges:
+            if attrs.get("relation") == "MENTIONED_IN":
+                # Chunk nodes are typed "Chunk"; the other end is the entity
+                if self.graph.nodes[source].get("type") == "Chunk":
+                    source, target = target, source
+                mentions.append((source, target))
+            else:
+                related.append((source, target))
+        self.entity_index.add_mentions(mentions)
+        self.entity_index.add_relationships(related)
+
+    def _load_keyword_index(self):
+        """
+        Fills the BM25 index from the vector store once. Chunks added meanwhile
+        are also indexed by add_document; BM25Index.add skips ids it already has.
+        """
+        if self._keyword_loaded:
+            return
+        with self._keyword_lock:
+            if self._keyword_loaded:
+                return
+            stored = self.vector_store.all()
+            self.keyword_index.add(stored["ids"], stored["documents"], stored["metadatas"])
+            self._keyword_loaded = True
+            print(f"Keyword index built with {self.keyword_index.count()} chunks")
+
+    def _keyword_search(self, query_text: str, n_results: int, where: dict):
+        self._load_keyword_index()
+        return self.keyword_index.search(query_text, n_results, where)
 
     async def add_document(self, text: str, metadata: dict):
         """
         Process document: Chunk -> Embed -> Vector Store -> Extract Entities -> Graph
         """
-        # 1. Chunking (Simple split for now)
-        chunks = [text[i:i+1000] for i in range(0, len(text), 1000)]
-        
-        ids = []
-        embeddings = []
+        # 1. Chunking (sentence / speaker-turn aware, with overlap; offsets map chunks back to the text)
+        chunks = []
         metadatas = []
-        documents = []
-
-        for i, chunk in enumerate(chunks):
-            chunk_id = str(uuid.uuid4())
-            embedding = await llm_service.get_embeddings(chunk)
-            
-            ids.append(chunk_id)
-            embeddings.append(embedding)
-            metadatas.append({**metadata, "chunk_index": i})
-            documents.append(chunk)
-            
-            # Graph Extraction (Simplified)
-            # In a real app, we'd batch this or do it async
-            await self._extract_and_update_graph(chunk, chunk_id)
-
-        self.collection.add(
+        for i, chunk in enumerate(iter_chunks(text, settings.RAG_CHUNK_TOKENS, settings.RAG_CHUNK_OVERLAP_TOKENS)):
+            chunks.append(chunk["text"])
+            metadatas.append({**metadata, "chunk_index": i, "char_start": chunk["start"], "char_end": chunk["end"]})
+        if not chunks:
+            return
+
+        ids = [str(uuid.uuid4()) for _ in chunks]
+
+        # 2. Embed in batches (several requests in flight), then one bulk insert
+        embeddings = await llm_service.get_embeddings_batch(chunks)
+
+        self.vector_store.add(
             ids=ids,
             embeddings=embeddings,
             metadatas=metadatas,
-            documents=documents
+            documents=chunks
         )
+        self.keyword_index.add(ids, chunks, metadatas)
+
+        # 3. Graph Extraction (several chunks per request)
+        await self._extract_and_update_graph(chunks, ids)
 
-    async def _extract_and_update_graph(self, text: str, chunk_id: str):
+    async def _extract_batch(self, chunks: list, chunk_ids: list):
         """
-        Extract entities and relationships using LLM and update graph.
+        One LLM call for a batch of chunks. Returns {chunk_id: {"entities", "relationships"}}.
         """
+        # Short labels instead of uuids keep the prompt small
+        labels = {f"C{i}": chunk_id for i, chunk_id in enumerate(chunk_ids)}
+        packed = "\n\n".join(f"[C{i}]\n{chunk}" for i, chunk in enumerate(chunks))
         prompt = f"""
-        Extract key entities (Product, Feature, Competitor, Objection, Customer) and their relationships from the following text.
-        Return JSON format: {{ "entities": [{{"name": "X", "type": "Y"}}], "relationships": [{{"source": "X", "target": "Z", "relation": "W"}}] }}
-        
-        Text: {text}
+        Extract key entities (Product, Feature, Competitor, Objection, Customer) and their relationships from each of the following text chunks.
+        Each chunk starts with its label in square brackets.
+        Return JSON format: {{ "chunks": [{{ "chunk": "C0", "entities": [{{"name": "X", "type": "Y"}}], "relationships": [{{"source": "X", "target": "Z", "relation": "W"}}] }}] }}
+        Include every chunk label, with empty lists if a chunk has nothing to extract.
+
+        {packed}
         """
-        try:
-            response = await llm_service.generate_json(prompt)
-            response = await llm_service.generate_json(prompt)
-            # Clean up markdown code blocks if present (just in case)
-            cleaned_response = response.replace("```json", "").replace("```", "").strip()
-            data = json.loads(cleaned_response)
-            
-            for entity in data.get("entities", []):
-                self.graph.add_node(entity["name"], type=entity["type"])
-                # Link entity to chunk for retrieval
-                self.graph.add_edge(entity["name"], chunk_id, relation="MENTIONED_IN")
-            
-            for rel in data.get("relationships", []):
-                self.graph.add_edge(rel["source"], rel["target"], relation=rel["relation"])
-                
-        except Exception as e:
-            print(f"Graph extraction failed: {e}")
-
-    async def query(self, query_text: str):
+        response = await llm_service.generate_json(prompt)
+        # Clean up markdown code blocks if present (just in case)
+        cleaned_response = response.replace("```json", "").replace("```", "").strip()
+        data = json.loads(cleaned_response)
+
+        results = {}
+        for item in data.get("chunks", []):
+            chunk_id = labels.get(str(item.get("chunk", "")).strip("[]"))
+            if chunk_id is not None:
+                results[chunk_id] = item
+        return results
+
+    async def _extract_and_update_graph(self, chunks: list, chunk_ids: list):
         """
-        Hybrid Retrieval: Vector + Graph
+        Extract entities and relationships using LLM and update graph.
+        Chunks are packed RAG_EXTRACTION_BATCH_CHUNKS per request, up to
+        RAG_EXTRACTION_CONCURRENCY requests run at once (the rate governor
+        still applies), and the graph is updated in one bulk operation.
         """
-        # 1. Vector Search
+        batch_size = max(1, settings.RAG_EXTRACTION_BATCH_CHUNKS)
+        semaphore = asyncio.Semaphore(max(1, settings.RAG_EXTRACTION_CONCURRENCY))
+
+        async def extract(start: int):
+            async with semaphore:
+                try:
+                    return await self._extract_batch(chunks[start:start + batch_size], chunk_ids[start:start + batch_size])
+                except Exception as e:
+                    print(f"Graph extraction failed: {e}")
+                    return {}
+
+        batches = await asyncio.gather(*[extract(start) for start in range(0, len(chunks), batch_size)])
+
+        nodes = []
+        edges = []
+        for results in batches:
+            for chunk_id, data in results.items():
+                nodes.append((chunk_id, {"type": "Chunk"}))
+                for entity in data.get("entities", []):
+                    if not entity.get("name"):
+                        continue
+                    nodes.append((entity["name"], {"type": entity.get("type")}))
+                    # Link entity to chunk for retrieval
+                    edges.append((entity["name"], chunk_id, {"relation": "MENTIONED_IN"}))
+                for rel in data.get("relationships", []):
+                    if rel.get("source") and rel.get("target"):
+                        edges.append((rel["source"], rel["target"], {"relation": rel.get("relation")}))
+
+        if not nodes:
+            return
+        self._apply_graph_update(nodes, edges)
+        self.graph_store.append(nodes, edges)
+        self.graph_store.maybe_compact()
+
+    async def _vector_search(self, query_text: str, n_results: int, where: dict):
         query_embedding = await llm_service.get_embeddings(query_text)
-        vector_results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=5
+        results = self.vector_store.query(query_embedding, n_results=n_results, where=where)
+        return results["ids"][0]
+
+    def _graph_search(self, query_text: str, n_results: int, where: dict):
+        """
+        Chunks reached from entities named in the query (and their 1-hop
+        neighbours) via the precomputed entity index.
+        """
+        hits = self.entity_index.expand(
+            query_text,
+            per_entity=n_results,
+            neighbour_limit=settings.RAG_GRAPH_NEIGHBOUR_LIMIT
         )
-        
-        # 2. Graph Search (Simple expansion)
-        # Extract entities from query
-        # Find neighbors in graph
-        # For now, just return vector results as primary, graph is internal enhancement
-        
-        return vector_results
+        chunk_ids = [chunk_id for chunk_id, _ in hits]
+        if where and chunk_ids:
+            records = self.vector_store.get(chunk_ids)
+            allowed = {
+                chunk_id for chunk_id, metadata in zip(records["ids"], records["metadatas"])
+                if matches_where(metadata or {}, where)
+            }
+            chunk_ids = [chunk_id for chunk_id in chunk_ids if chunk_id in allowed]
+        return chunk_ids[:n_results]
+
+    async def query(self, query_text: str, where: dict = None, n_results: int = 5):
+        """
+        Hybrid Retrieval: BM25 + Vector + Graph
+        Keyword and vector search run side by side; chunks linked to entities
+        named in the query (and their neighbours) are added from the entity
+        index, and the three rankings are merged with reciprocal rank fusion. `where` filters chunks by metadata, e.g.
+        {"meeting_id": 3, "chunk_index": {"$lte": 10}}.
+        Returns Chroma's query layout with fused "scores" in place of distances.
+        """
+        candidates = max(n_results, settings.RAG_CANDIDATES)
+
+        # 1. Keyword + Vector Search (BM25 scoring runs off the event loop meanwhile)
+        keyword_hits, vector_ids = await asyncio.gather(
+            asyncio.to_thread(self._keyword_search, query_text, candidates, where),
+            self._vector_search(query_text, candidates, where)
+        )
+        keyword_ids = [chunk_id for chunk_id, _ in keyword_hits]
+
+        # 2. Graph Search (entity -> chunk and neighbour lookups, no traversal)
+        graph_ids = self._graph_search(query_text, candidates, where)
+
+        # 3. Rank fusion
+        fused = reciprocal_rank_fusion([keyword_ids, vector_ids, graph_ids], k=settings.RAG_RRF_K)[:n_results]
+        if not fused:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "scores": [[]]}
+
+        records = self.vector_store.get([chunk_id for chunk_id, _ in fused])
+        by_id = {
+            chunk_id: (document, metadata)
+            for chunk_id, document, metadata in zip(records["ids"], records["documents"], records["metadatas"])
+        }
+        hits = [(chunk_id, score) for chunk_id, score in fused if chunk_id in by_id]
+        return {
+            "ids": [[chunk_id for chunk_id, _ in hits]],
+            "documents": [[by_id[chunk_id][0] for chunk_id, _ in hits]],
+            "metadatas": [[by_id[chunk_id][1] for chunk_id, _ in hits]],
+            "scores": [[score for _, score in hits]]
+        }
 
 rag_service = RAGService()
@@ -0,0 +1,323 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+from app.core.config import settings
+
+# Priority class of the work running in the current context. Request handlers
+# run as "interactive"; background jobs switch their context to "batch".
+current_priority = contextvars.ContextVar("current_priority", default="interactive")
+
+PRIORITIES = ["interactive", "batch"]
+
+def rate_limit_info(error):
+    """
+    Returns (is_rate_limited, retry_after_seconds or None) for a provider error.
+    Understands Groq/httpx style errors (status_code + response headers) and
+    Google errors (code 429 / RESOURCE_EXHAUSTED).
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        code = getattr(error, "code", None)
+        status = code if isinstance(code, int) else None
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+
+    text = str(error)
+    limited = status == 429 or "RESOURCE_EXHAUSTED" in text or "rate limit" in text.lower()
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if limited and headers is not None:
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return limited, retry_after
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `per_minute` / 60 per second.
+    Consumption may drive it negative (usage reported after the fact), which
+    simply delays the next caller until the deficit is refilled.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float, factor: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate * factor)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float, factor: float = 1.0) -> float:
+        self._refill(now, factor)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.rate * factor)
+
+    def consume(self, amount: float):
+        self.level -= amount
+
+class ProviderLimiter:
+    """
+    Request-rate and token-rate limits for one (provider, model), with
+    adaptive backoff on 429s and weighted fair queuing between priorities:
+    while both classes are waiting, up to RATE_LIMIT_INTERACTIVE_WEIGHT
+    interactive callers are served for each batch caller.
+    """
+    def __init__(self, key: str, requests_per_minute: float, tokens_per_minute: float = 0):
+        self.key = key
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        # Adaptive state: scale applied to refill rates, and a hard pause after a 429
+        self.rate_factor = 1.0
+        self.blocked_until = 0.0
+        self.strikes = 0
+
+        self.waiters = {priority: deque() for priority in PRIORITIES}
+        self.served_interactive = 0
+        self._lock = threading.Lock()
+        self._condition = None
+
+        self.granted = 0
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+
+    def _cond(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _wait_time(self, tokens: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self.blocked_until - now)
+            wait = max(wait, self.requests.wait_time(1, now, self.rate_factor))
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.wait_time(tokens, now, self.rate_factor))
+            elif self.tokens is not None:
+                # Even without an estimate, don't start while tokens are in deficit
+                wait = max(wait, self.tokens.wait_time(0, now, self.rate_factor))
+            return wait
+
+    def _consume(self, tokens: float):
+        with self._lock:
+            self.requests.consume(1)
+            if self.tokens is not None and tokens:
+                self.tokens.consume(tokens)
+            self.granted += 1
+
+    def _next_waiter(self):
+        interactive = self.waiters["interactive"]
+        batch = self.waiters["batch"]
+        if interactive and batch:
+            if self.served_interactive < settings.RATE_LIMIT_INTERACTIVE_WEIGHT:
+                return interactive[0]
+            return batch[0]
+        if interactive:
+            return interactive[0]
+        if batch:
+            return batch[0]
+        return None
+
+    async def acquire(self, priority: str = None, tokens: float = 0):
+        """
+        Waits for this caller's turn and for budget, then consumes one request
+        (and `tokens` estimated tokens).
+        """
+        priority = priority if priority in self.waiters else "interactive"
+        waiter = object()
+        queue = self.waiters[priority]
+        queue.append(waiter)
+        started = time.monotonic()
+        cond = self._cond()
+
+        async with cond:
+            try:
+                while True:
+                    if self._next_waiter() is waiter:
+                        wait = self._wait_time(tokens)
+                        if wait <= 0:
+                            self._consume(tokens)
+                            queue.popleft()
+                            self.served_interactive = self.served_interactive + 1 if priority == "interactive" else 0
+                            self.waited_seconds += time.monotonic() - started
+                            cond.notify_all()
+                            return
+                        try:
+                            await asyncio.wait_for(cond.wait(), timeout=wait)
+                        except asyncio.TimeoutError:
+                            # Someone of higher priority may have queued meanwhile; let them re-check
+                            cond.notify_all()
+                    else:
+                        await cond.wait()
+            except BaseException:
+                if waiter in queue:
+                    queue.remove(waiter)
+                cond.notify_all()
+                raise
+
+    def acquire_sync(self, blocking: bool = True) -> bool:
+        """
+        Thread-side acquire for sync LangChain calls (no fair queuing).
+        """
+        while True:
+            wait = self._wait_time(0)
+            if wait <= 0:
+                self._consume(0)
+                return True
+            if not blocking:
+                return False
+            time.sleep(wait)
+
+    def record_tokens(self, tokens: float):
+        """
+        Charges actual token usage reported after a call.
+        """
+        if self.tokens is not None and tokens:
+            with self._lock:
+                self.tokens.consume(tokens)
+
+    def penalize(self, retry_after: float = None):
+        """
+        Reacts to a 429: pause until Retry-After (or an exponential backoff)
+        and halve the refill rate so throughput settles below the provider limit.
+        """
+        with self._lock:
+            self.strikes += 1
+            self.rate_limited += 1
+            if retry_after is None:
+                retry_after = min(settings.RATE_LIMIT_MAX_BACKOFF_SECONDS, 2 ** self.strikes)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.rate_factor = max(settings.RATE_LIMIT_MIN_FACTOR, self.rate_factor * 0.5)
+        print(f"Rate limited on {self.key}: pausing {retry_after:.1f}s, rate factor {self.rate_factor:.2f}")
+
+    def reward(self):
+        # Additive recovery after successful calls
+        with self._lock:
+            self.strikes = 0
+            self.rate_factor = min(1.0, self.rate_factor + 0.05)
+
+    def stats(self) -> dict:
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+            "rate_factor": round(self.rate_factor, 3),
+            "paused_for": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+            "waiting": {priority: len(queue) for priority, queue in self.waiters.items()},
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
+
+class GovernorRateLimiter(BaseRateLimiter):
+    """
+    Adapter plugging a ProviderLimiter into LangChain chat models
+    (`rate_limiter=`); LangChain only calls it for non-cached requests.
+    """
+    def __init__(self, limiter: ProviderLimiter):
+        self.limiter = limiter
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.limiter.acquire_sync(blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return self.limiter.acquire_sync(blocking=False)
+        await self.limiter.acquire(current_priority.get())
+        return True
+
+class GovernorCallback(BaseCallbackHandler):
+    """
+    Feeds chat model outcomes back into the limiter: token usage on success,
+    backoff on 429.
+    """
+    run_inline = True
+
+    def __init__(self, limiter: ProviderLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs):
+        tokens = 0
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens = usage.get("total_tokens") or 0
+        if not tokens:
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    tokens += metadata.get("total_tokens", 0)
+        self.limiter.record_tokens(tokens)
+        self.limiter.reward()
+
+    def on_llm_error(self, error, **kwargs):
+        limited, retry_after = rate_limit_info(error)
+        if limited:
+            self.limiter.penalize(retry_after)
+
+class RateGovernor:
+    """
+    Shared registry of ProviderLimiters, one per (provider, model). Defaults
+    come from the per-provider settings; RATE_LIMIT_OVERRIDES can set
+    {"provider:model": {"rpm": .., "tpm": ..}} for individual models.
+    """
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, provider: str, model: str):
+        defaults = {
+            "groq": (settings.GROQ_REQUESTS_PER_MINUTE, settings.GROQ_TOKENS_PER_MINUTE),
+            "gemini": (settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE)
+        }
+        rpm, tpm = defaults.get(provider, (60, 0))
+        override = settings.RATE_LIMIT_OVERRIDES.get(f"{provider}:{model}", {})
+        return override.get("rpm", rpm), override.get("tpm", tpm)
+
+    def limiter(self, provider: str, model: str) -> ProviderLimiter:
+        key = f"{provider}:{model}"
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    rpm, tpm = self._limits(provider, model)
+                    limiter = ProviderLimiter(key, rpm, tpm)
+                    self._limiters[key] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def limit(self, provider: str, model: str, tokens: float = 0, priority: str = None):
+        """
+        Guards a direct SDK call: waits for budget, then records the outcome.
+        `tokens` is an estimate of the call's token usage.
+        """
+        limiter = self.limiter(provider, model)
+        await limiter.acquire(priority or current_priority.get(), tokens)
+        try:
+            yield limiter
+        except Exception as e:
+            limited, retry_after = rate_limit_info(e)
+            if limited:
+                limiter.penalize(retry_after)
+            raise
+        limiter.reward()
+
+    def rate_limiter(self, provider: str, model: str) -> GovernorRateLimiter:
+        return GovernorRateLimiter(self.limiter(provider, model))
+
+    def callbacks(self, provider: str, model: str):
+        return [GovernorCallback(self.limiter(provider, model))]
+
+    def stats(self) -> dict:
+        return {key: limiter.stats() for key, limiter in self._limiters.items()}
+
+rate_governor = RateGovernor()
@@ -0,0 +1,112 @@
+import re
+
+# Rough characters-per-token ratio for English text with common LLM tokenizers.
+# Good enough for budgeting prompts without pulling in a tokenizer.
+CHARS_PER_TOKEN = 4
+
+# Sentence ends (., !, ? followed by whitespace) and line breaks
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def _sentence_spans(text: str):
+    """
+    Yields (start, end) character spans of sentences / lines in text.
+    """
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        if match.start() > start:
+            yield start, match.start()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+def _split_long_span(text: str, start: int, end: int, max_chars: int):
+    """
+    Hard-splits a single over-long sentence on whitespace (or mid-word as a last resort).
+    """
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield start, end
+
+def split_into_segments(text: str, max_tokens: int):
+    """
+    Splits text into consecutive segments of at most ~max_tokens tokens,
+    breaking only between sentences / lines unless a sentence alone is
+    over budget. Returns a list of strings.
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    segments = []
+    seg_start = seg_end = None
+
+    for start, end in _sentence_spans(text):
+        for s, e in _split_long_span(text, start, end, max_chars):
+            if seg_start is not None and e - seg_start > max_chars:
+                segments.append(text[seg_start:seg_end])
+                seg_start = None
+            if seg_start is None:
+                seg_start = s
+            seg_end = e
+
+    if seg_start is not None:
+        segments.append(text[seg_start:seg_end])
+    return segments
+
+# A line opening a speaker turn: "Alice:", "Speaker 2:", "[00:01:02] John Smith:"
+_SPEAKER_TURN = re.compile(r"(?:\[[\d:.,\s-]+\]\s*)?[A-Z][\w .'-]{0,40}:\s")
+
+def _is_turn_start(text: str, start: int) -> bool:
+    at_line_start = start == 0 or text[start - 1] == "\n"
+    return at_line_start and _SPEAKER_TURN.match(text, start) is not None
+
+def iter_chunks(text: str, max_tokens: int, overlap_tokens: int = 0):
+    """
+    Streams retrieval chunks of at most ~max_tokens tokens as dicts
+    {"text", "start", "end", "tokens"}, with start/end character offsets into
+    text. Chunks break between sentences; a new speaker turn starts a fresh
+    chunk once the current one is half full. Consecutive chunks within a turn
+    share up to ~overlap_tokens of trailing sentences.
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    overlap_chars = max(0, overlap_tokens * CHARS_PER_TOKEN)
+    pieces = [] # (start, end) spans in the current chunk
+    fresh = 0 # spans in pieces that weren't carried over as overlap
+
+    def emit():
+        start, end = pieces[0][0], pieces[-1][1]
+        return {"text": text[start:end], "start": start, "end": end, "tokens": estimate_tokens(text[start:end])}
+
+    for start, end in _sentence_spans(text):
+        turn = _is_turn_start(text, start)
+        for i, (s, e) in enumerate(_split_long_span(text, start, end, max_chars)):
+            if pieces:
+                over_budget = e - pieces[0][0] > max_chars
+                turn_break = turn and i == 0 and pieces[-1][1] - pieces[0][0] >= max_chars // 2
+                if over_budget or turn_break:
+                    if fresh:
+                        yield emit()
+                    tail = []
+                    if over_budget and overlap_chars:
+                        for piece in reversed(pieces):
+                            if pieces[-1][1] - piece[0] > overlap_chars:
+                                break
+                            tail.insert(0, piece)
+                        while tail and e - tail[0][0] > max_chars:
+                            tail.pop(0)
+                    pieces = tail
+                    fresh = 0
+            pieces.append((s, e))
+            fresh += 1
+
+    if pieces and fresh:
+        yield emit()
@@ -1,10 +1,116 @@
 import os
+import re
+import shutil
+import asyncio
+import subprocess
 import tempfile
 from google import genai
 from google.genai import types
 from groq import Groq
 from app.core.config import settings
-from moviepy import *
+from app.services.rate_limiter import rate_governor
+
+WHISPER_MODEL = "whisper-large-v3"
+GEMINI_TRANSCRIPTION_MODEL = "gemini-2.0-flash"
+
+# Encoder settings for the audio sent to Whisper. 16 kHz mono is what Whisper
+# resamples to anyway; Opus at 24 kbps keeps ~2 hours under the 25MB limit.
+AUDIO_FORMATS = {
+    "opus": {
+        "suffix": ".ogg",
+        "container": "ogg",
+        "codec_args": ["-c:a", "libopus", "-b:a", settings.TRANSCRIPTION_AUDIO_BITRATE, "-application", "voip"]
+    },
+    "flac": {
+        "suffix": ".flac",
+        "container": "flac",
+        "codec_args": ["-c:a", "flac", "-sample_fmt", "s16"]
+    }
+}
+
+def _ffmpeg_exe() -> str:
+    # Prefer a system ffmpeg, else the binary bundled with imageio-ffmpeg (a moviepy dependency)
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+def _run_ffmpeg(args) -> bytes:
+    """
+    Runs ffmpeg with the given arguments and returns whatever it wrote to stdout.
+    """
+    process = subprocess.run(
+        [_ffmpeg_exe(), "-nostdin", "-hide_banner", "-loglevel", "error", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {process.stderr.decode(errors='ignore').strip()}")
+    return process.stdout
+
+def probe_duration(media_path: str) -> float:
+    """
+    Reads the container duration (in seconds) from ffmpeg's input banner.
+    """
+    process = subprocess.run(
+        [_ffmpeg_exe(), "-nostdin", "-hide_banner", "-i", media_path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", process.stderr.decode(errors="ignore"))
+    if not match:
+        raise RuntimeError(f"Could not determine duration of {media_path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def chunk_windows(duration: float, chunk_seconds: float, overlap_seconds: float = 0):
+    """
+    Returns (start, end) windows covering [0, duration). Every window after the
+    first starts `chunk_seconds` after the previous one and each window extends
+    `overlap_seconds` past the next start, so boundary words appear in both.
+    No window starts inside the previous one's overlap tail (it would be a
+    redundant sub-second clip, which Whisper tends to hallucinate on).
+    """
+    windows = []
+    start = 0.0
+    while start < duration and (not windows or start < duration - overlap_seconds):
+        end = min(start + chunk_seconds + overlap_seconds, duration)
+        windows.append((start, end))
+        start += chunk_seconds
+    return windows
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+def stitch_transcripts(parts, max_overlap_words: int = 40, min_overlap_words: int = 3, max_skip_words: int = 4) -> str:
+    """
+    Joins chunk transcripts in order, dropping the words at the start of each
+    chunk that repeat the end of the previous one (the overlapped audio).
+    Matching ignores case and punctuation, and tolerates a few leading words
+    Whisper may have produced from a word cut in half at the chunk start.
+    """
+    words = []
+    for part in parts:
+        next_words = (part or "").split()
+        if not words:
+            words.extend(next_words)
+            continue
+
+        tail = [_normalize_word(w) for w in words[-max_overlap_words:]]
+        head = [_normalize_word(w) for w in next_words[:max_overlap_words + max_skip_words]]
+
+        drop = 0
+        for skip in range(max_skip_words + 1):
+            for size in range(min(len(tail), len(head) - skip), min_overlap_words - 1, -1):
+                if tail[-size:] == head[skip:skip + size]:
+                    drop = skip + size
+                    break
+            if drop:
+                break
+
+        words.extend(next_words[drop:])
+    return " ".join(words)
 
 class TranscriptionService:
     def __init__(self):
@@ -13,39 +119,92 @@ class TranscriptionService:
 
     def extract_audio_from_video(self, video_path: str) -> str:
         """
-        Extracts audio from video file and saves as temporary mp3.
+        Streams the audio track through ffmpeg into a temporary 16 kHz mono
+        low-bitrate file (TRANSCRIPTION_AUDIO_FORMAT). ffmpeg decodes and encodes
+        incrementally, so memory stays flat regardless of the video length.
         Returns the path to the audio file.
         """
+        audio_format = AUDIO_FORMATS[settings.TRANSCRIPTION_AUDIO_FORMAT]
+        temp_audio = tempfile.NamedTemporaryFile(suffix=audio_format["suffix"], delete=False)
+        temp_audio.close()
+
         try:
-            video = VideoFileClip(video_path)
-            # Create temp file
-            temp_audio = tempfile.NamedTemporaryFile(suffix=".mp3", delete=False)
-            temp_audio.close()
-            
-            video.audio.write_audiofile(temp_audio.name, verbose=False, logger=None)
+            _run_ffmpeg([
+                "-i", video_path,
+                "-vn", "-ac", "1", "-ar", "16000",
+                *audio_format["codec_args"],
+                "-f", audio_format["container"],
+                "-y", temp_audio.name
+            ])
             return temp_audio.name
         except Exception as e:
             print(f"Error extracting audio: {e}")
+            os.remove(temp_audio.name)
             raise e
 
-    def transcribe_audio_groq(self, audio_path: str) -> str:
+    def transcribe_audio_groq(self, audio_path: str, audio_bytes: bytes = None) -> str:
         """
         Transcribes audio using Groq's whisper-large-v3 model.
+        If audio_bytes is given it is sent as is and audio_path only names the upload.
         """
         try:
-            with open(audio_path, "rb") as file:
-                transcription = self.groq_client.audio.transcriptions.create(
-                    file=(os.path.basename(audio_path), file.read()),
-                    model="whisper-large-v3",
-                    response_format="text"
-                )
+            if audio_bytes is None:
+                with open(audio_path, "rb") as file:
+                    audio_bytes = file.read()
+            transcription = self.groq_client.audio.transcriptions.create(
+                file=(os.path.basename(audio_path), audio_bytes),
+                model=WHISPER_MODEL,
+                response_format="text"
+            )
             return transcription
         except Exception as e:
             print(f"Error calling Groq Whisper: {e}")
             raise e
-        finally:
-            # Clean up temp audio if managed here, but caller should ideally manage
-            pass
+
+    def _read_audio_chunk(self, audio_path: str, start: float, end: float) -> bytes:
+        """
+        Cuts the [start, end) slice out of an extracted audio file without
+        re-encoding and returns it in memory (no temp chunk files).
+        """
+        audio_format = AUDIO_FORMATS[settings.TRANSCRIPTION_AUDIO_FORMAT]
+        return _run_ffmpeg([
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+            "-i", audio_path,
+            "-c", "copy",
+            "-f", audio_format["container"],
+            "pipe:1"
+        ])
+
+    def _audio_duration(self, audio_path: str) -> float:
+        return probe_duration(audio_path)
+
+    async def _transcribe_chunk(self, semaphore: asyncio.Semaphore, audio_path: str, index: int,
+                                total: int, start: float, end: float, transcribe=None) -> str:
+        suffix = AUDIO_FORMATS[settings.TRANSCRIPTION_AUDIO_FORMAT]["suffix"]
+        async with semaphore:
+            print(f"Processing chunk {index+1}/{total} ({start:.0f}-{end:.0f}s)...")
+            chunk_bytes = await asyncio.to_thread(self._read_audio_chunk, audio_path, start, end)
+            if transcribe:
+                return await asyncio.to_thread(transcribe, f"chunk_{index}{suffix}", chunk_bytes)
+            async with rate_governor.limit("groq", WHISPER_MODEL):
+                return await asyncio.to_thread(self.transcribe_audio_groq, f"chunk_{index}{suffix}", chunk_bytes)
+
+    async def transcribe_audio_groq_chunked(self, audio_path: str, transcribe=None) -> str:
+        """
+        Splits audio into overlapping chunks and transcribes them concurrently
+        (bounded by GROQ_TRANSCRIPTION_CONCURRENCY), then stitches the pieces back
+        together in order. `transcribe` defaults to Groq Whisper; any callable
+        taking (chunk_name, chunk_bytes) and returning text can stand in for it.
+        """
+        duration = await asyncio.to_thread(self._audio_duration, audio_path)
+        windows = chunk_windows(duration, settings.GROQ_CHUNK_SECONDS, settings.GROQ_CHUNK_OVERLAP_SECONDS)
+
+        semaphore = asyncio.Semaphore(max(1, settings.GROQ_TRANSCRIPTION_CONCURRENCY))
+        parts = await asyncio.gather(*[
+            self._transcribe_chunk(semaphore, audio_path, i, len(windows), start, end, transcribe)
+            for i, (start, end) in enumerate(windows)
+        ])
+        return stitch_transcripts(parts)
 
     async def transcribe_video(self, video_path: str, prompt: str = "Generate a detailed transcript of this video.", method: str = "gemini"):
         """
@@ -56,7 +215,7 @@ class TranscriptionService:
             print("Using Groq Whisper for transcription...")
             audio_path = None
             try:
-                audio_path = self.extract_audio_from_video(video_path)
+                audio_path = await asyncio.to_thread(self.extract_audio_from_video, video_path)
                 
                 # Check file size
                 file_size_mb = os.path.getsize(audio_path) / (1024 * 1024)
@@ -64,45 +223,10 @@ class TranscriptionService:
                 
                 if file_size_mb > 24: # Safety for 25MB limit
                     print("File too large for single request. Chunking...")
-                    # Load audio to determine duration
-                    # We can use MoviePy's AudioFileClip to split
-                    from moviepy.editor import AudioFileClip
-                    
-                    full_audio = AudioFileClip(audio_path)
-                    duration = full_audio.duration
-                    
-                    # Split into 10-minute chunks (600 seconds)
-                    chunk_duration = 600
-                    chunks = int(duration / chunk_duration) + 1
-                    
-                    full_transcript = []
-                    
-                    for i in range(chunks):
-                        start = i * chunk_duration
-                        end = min((i + 1) * chunk_duration, duration)
-                        
-                        if start >= end: break
-                        
-                        print(f"Processing chunk {i+1}/{chunks} ({start}-{end}s)...")
-                        
-                        chunk_filename = f"{audio_path}_chunk_{i}.mp3"
-                        # Subclip and write
-                        chunk_clip = full_audio.subclip(start, end)
-                        chunk_clip.write_audiofile(chunk_filename, verbose=False, logger=None)
-                        
-                        # Transcribe chunk
-                        chunk_text = self.transcribe_audio_groq(chunk_filename)
-                        full_transcript.append(chunk_text)
-                        
-                        # Cleanup chunk
-                        chunk_clip.close()
-                        if os.path.exists(chunk_filename):
-                            os.remove(chunk_filename)
-                            
-                    full_audio.close()
-                    return " ".join(full_transcript)
+                    return await self.transcribe_audio_groq_chunked(audio_path)
                 else:
-                    text = self.transcribe_audio_groq(audio_path)
+                    async with rate_governor.limit("groq", WHISPER_MODEL):
+                        text = await asyncio.to_thread(self.transcribe_audio_groq, audio_path)
                     return text
 
             except Exception as e:
@@ -113,29 +237,27 @@ class TranscriptionService:
                    os.remove(audio_path)
         
         # Default Gemini Flow
+        # Uses the SDK's async client (client.aio) so uploads, processing polls and
+        # generation never block the event loop.
         try:
             # Upload the file
             # Note: In a real prod app, we might want to manage file lifecycle (delete after processing)
             # For now, we upload and let Gemini handle it.
-            video_file = self.client.files.upload(file=video_path)
-            
-            # Wait for processing if necessary (Gemini usually handles this, but for large videos might need polling)
-            while video_file.state == types.FileState.PROCESSING:
-                import time
-                time.sleep(2)
-                video_file = self.client.files.get(name=video_file.name)
+            async with rate_governor.limit("gemini", "files"):
+                video_file = await self.client.aio.files.upload(file=video_path)
 
-            if video_file.state == types.FileState.FAILED:
-                raise Exception("Video processing failed by Gemini.")
+            # Large videos stay in PROCESSING for a while before they can be used
+            video_file = await self.wait_for_file_active(video_file)
 
             # Generate content
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[
-                    video_file,
-                    prompt
-                ]
-            )
+            async with rate_governor.limit("gemini", GEMINI_TRANSCRIPTION_MODEL):
+                response = await self.client.aio.models.generate_content(
+                    model=GEMINI_TRANSCRIPTION_MODEL,
+                    contents=[
+                        video_file,
+                        prompt
+                    ]
+                )
             
             return response.text
 
@@ -143,4 +265,28 @@ class TranscriptionService:
             print(f"Error in transcription: {e}")
             raise e
 
+    async def wait_for_file_active(self, video_file, timeout: float = None):
+        """
+        Polls an uploaded Gemini file until it leaves PROCESSING, backing off
+        exponentially between polls (GEMINI_POLL_INITIAL_SECONDS doubling up to
+        GEMINI_POLL_MAX_SECONDS). Raises TimeoutError once the deadline passes.
+        """
+        timeout = timeout if timeout is not None else settings.GEMINI_PROCESSING_TIMEOUT_SECONDS
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = settings.GEMINI_POLL_INITIAL_SECONDS
+
+        while video_file.state == types.FileState.PROCESSING:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"Gemini did not finish processing {video_file.name} within {timeout}s")
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, settings.GEMINI_POLL_MAX_SECONDS)
+            async with rate_governor.limit("gemini", "files"):
+                video_file = await self.client.aio.files.get(name=video_file.name)
+
+        if video_file.state == types.FileState.FAILED:
+            raise Exception("Video processing failed by Gemini.")
+        return video_file
+
 transcription_service = TranscriptionService()
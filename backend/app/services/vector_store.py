@@ -0,0 +1,327 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from app.core.config import settings
+
+class VectorStore(ABC):
+    """
+    Vector backend used by RAGService. Results use Chroma's query layout:
+    {"ids": [[...]], "documents": [[...]], "metadatas": [[...]], "distances": [[...]]}
+    with cosine distances. `where` filters use the Chroma operator subset
+    {"field": value} / {"field": {"$eq|$ne|$gt|$gte|$lt|$lte|$in": value}}; several
+    fields are ANDed.
+    """
+    @abstractmethod
+    def add(self, ids, embeddings, metadatas, documents):
+        ...
+
+    @abstractmethod
+    def query(self, embedding, n_results: int = 5, where: dict = None) -> dict:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def get(self, ids) -> dict:
+        """
+        Returns {"ids", "documents", "metadatas"} for the given chunk ids (unknown ids are skipped).
+        """
+        ...
+
+    @abstractmethod
+    def all(self) -> dict:
+        """
+        Returns {"ids", "documents", "metadatas"} for every stored chunk.
+        """
+        ...
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, mode: str, directory: str):
+        import chromadb
+
+        if mode == "persistent":
+            # Opens the on-disk index as is (no re-embedding, no rebuild)
+            self.client = chromadb.PersistentClient(path=directory)
+        else:
+            self.client = chromadb.Client()
+        # get-or-create so restarts and repeated instantiation reuse the existing collection
+        self.collection = self.client.get_or_create_collection(
+            name="transcripts",
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def add(self, ids, embeddings, metadatas, documents):
+        self.collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def query(self, embedding, n_results: int = 5, where: dict = None) -> dict:
+        kwargs = {}
+        if where:
+            clauses = [{key: value} for key, value in where.items()]
+            kwargs["where"] = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+        return self.collection.query(query_embeddings=[embedding], n_results=n_results, **kwargs)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get(self, ids) -> dict:
+        ids = list(ids)
+        if not ids:
+            # Chroma rejects an empty id list
+            return {"ids": [], "documents": [], "metadatas": []}
+        result = self.collection.get(ids=ids)
+        return {"ids": result["ids"], "documents": result["documents"], "metadatas": result["metadatas"]}
+
+    def all(self) -> dict:
+        result = self.collection.get(include=["documents", "metadatas"])
+        return {"ids": result["ids"], "documents": result["documents"], "metadatas": result["metadatas"]}
+
+def _isin(column, values: list):
+    # Plain membership: np.isin would coerce mixed lists like [2, "x"] to strings
+    if isinstance(column, np.ndarray):
+        return np.fromiter((v in values for v in column), dtype=bool, count=len(column))
+    return column in values
+
+_OPERATORS = {
+    "$eq": lambda column, value: column == value,
+    "$ne": lambda column, value: column != value,
+    "$gt": lambda column, value: column > value,
+    "$gte": lambda column, value: column >= value,
+    "$lt": lambda column, value: column < value,
+    "$lte": lambda column, value: column <= value,
+    "$in": lambda column, value: _isin(column, list(value))
+}
+
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def matches_where(metadata: dict, where: dict) -> bool:
+    """
+    Evaluates a `where` filter against one metadata dict (same operators as the vector stores).
+    """
+    for key, condition in (where or {}).items():
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            try:
+                if not bool(_OPERATORS[op](value, operand)):
+                    return False
+            except TypeError:
+                # e.g. a range check against a missing field
+                return False
+    return True
+
+class NumpyVectorStore(VectorStore):
+    """
+    Dependency-light exact-search backend for edge installs and CI.
+    Embeddings are L2-normalised on insert and kept in a memory-mapped float32
+    matrix (vectors.f32, grown by doubling); ids, documents and metadata are
+    appended to records.jsonl. Top-k is a blocked matrix-vector product plus
+    argpartition, so queries never materialise more than QUERY_BLOCK rows of
+    scores at a time beyond the result.
+    """
+    QUERY_BLOCK = 65536
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._records_path = os.path.join(directory, "records.jsonl")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock = threading.Lock()
+
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self._id_index = {}
+        self._columns = {}
+
+        meta = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        self.dim = meta.get("dim")
+        self.capacity = meta.get("capacity", 0)
+
+        if os.path.exists(self._records_path):
+            with open(self._records_path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break # Torn final line from a crash; rows after it were never acknowledged
+                    self._append_record(record["id"], record["document"], record["metadata"])
+
+        self.matrix = None
+        if self.dim and self.capacity:
+            self.matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+
+    def _append_record(self, chunk_id, document, metadata):
+        self._id_index[chunk_id] = len(self.ids)
+        self.ids.append(chunk_id)
+        self.documents.append(document)
+        self.metadatas.append(metadata or {})
+        self._columns = {}
+
+    def _save_meta(self):
+        with open(self._meta_path, "w") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity}, f)
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self.capacity:
+            return
+        capacity = max(1024, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        if self.matrix is not None:
+            self.matrix.flush()
+            del self.matrix
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * np.dtype(np.float32).itemsize)
+        self.capacity = capacity
+        self.matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+        self._save_meta()
+
+    def add(self, ids, embeddings, metadatas, documents):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or not len(vectors):
+            return
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._save_meta()
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+
+            # Like Chroma's add: ids already stored (or repeated in this batch) are skipped,
+            # so a retried insert never leaves orphan rows behind
+            keep = []
+            seen = set()
+            for i, chunk_id in enumerate(ids):
+                if chunk_id not in self._id_index and chunk_id not in seen:
+                    seen.add(chunk_id)
+                    keep.append(i)
+            if not keep:
+                return
+            if len(keep) < len(vectors):
+                vectors = vectors[keep]
+                ids = [ids[i] for i in keep]
+                documents = [documents[i] for i in keep]
+                metadatas = [metadatas[i] for i in keep]
+
+            start = len(self.ids)
+            self._ensure_capacity(start + len(vectors))
+            self.matrix[start:start + len(vectors)] = vectors
+            self.matrix.flush()
+
+            # Records are the commit point: rows without a record are ignored on load
+            with open(self._records_path, "a") as f:
+                for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": chunk_id, "document": document, "metadata": metadata}) + "\n")
+                    self._append_record(chunk_id, document, metadata)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            column = np.empty(len(self.metadatas), dtype=object)
+            column[:] = [m.get(key) for m in self.metadatas]
+            self._columns[key] = column
+        return column
+
+    def _numeric_column(self, key: str) -> np.ndarray:
+        # Numbers as float64; missing or non-numeric values are NaN, which compares False
+        column = self._columns.get(("numeric", key))
+        if column is None:
+            column = np.array(
+                [v if _is_number(v) else np.nan for v in self._column(key)],
+                dtype=np.float64
+            )
+            self._columns[("numeric", key)] = column
+        return column
+
+    def _mask(self, where: dict):
+        if not where:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op in _RANGE_OPERATORS and _is_number(value):
+                    mask &= _OPERATORS[op](self._numeric_column(key), value)
+                elif op in _RANGE_OPERATORS:
+                    # e.g. string ranges: per value, with incomparable values as non-matches
+                    mask &= np.array([matches_where({key: v}, {key: {op: value}}) for v in self._column(key)], dtype=bool)
+                else:
+                    mask &= np.asarray(_OPERATORS[op](self._column(key), value), dtype=bool)
+        return mask
+
+    def query(self, embedding, n_results: int = 5, where: dict = None) -> dict:
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        n = len(self.ids)
+        if not n or self.matrix is None:
+            return empty
+
+        q = np.asarray(embedding, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1)
+        mask = self._mask(where)
+
+        # Best candidates per block, then a final top-k over those
+        candidate_idx = []
+        candidate_scores = []
+        for start in range(0, n, self.QUERY_BLOCK):
+            end = min(start + self.QUERY_BLOCK, n)
+            scores = self.matrix[start:end] @ q
+            if mask is not None:
+                scores = np.where(mask[start:end], scores, -np.inf)
+            k = min(n_results, end - start)
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidate_idx.append(top + start)
+            candidate_scores.append(scores[top])
+
+        idx = np.concatenate(candidate_idx)
+        scores = np.concatenate(candidate_scores)
+        order = np.argsort(-scores)[:n_results]
+        idx, scores = idx[order], scores[order]
+        keep = np.isfinite(scores)
+        idx, scores = idx[keep], scores[keep]
+
+        return {
+            "ids": [[self.ids[i] for i in idx]],
+            "documents": [[self.documents[i] for i in idx]],
+            "metadatas": [[self.metadatas[i] for i in idx]],
+            "distances": [[float(1 - s) for s in scores]]
+        }
+
+    def get(self, ids) -> dict:
+        rows = [self._id_index[i] for i in ids if i in self._id_index]
+        return {
+            "ids": [self.ids[i] for i in rows],
+            "documents": [self.documents[i] for i in rows],
+            "metadatas": [self.metadatas[i] for i in rows]
+        }
+
+    def all(self) -> dict:
+        return {"ids": list(self.ids), "documents": list(self.documents), "metadatas": list(self.metadatas)}
+
+def create_vector_store() -> VectorStore:
+    """
+    Builds the backend selected by VECTOR_BACKEND ("chroma" or "numpy").
+    """
+    if settings.VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore(os.path.join(settings.VECTOR_STORE_DIR, "numpy"))
+    return ChromaVectorStore(settings.VECTOR_STORE_MODE, settings.VECTOR_STORE_DIR)
@@ -1,19 +1,47 @@
-import shutil
+import hashlib
 import os
+import uuid
 from fastapi import UploadFile
 from pathlib import Path
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Read uploads in 1MB pieces so large videos are never held in memory
+CHUNK_SIZE = 1024 * 1024
+
 class VideoService:
-    async def save_upload(self, file: UploadFile) -> str:
+    async def save_upload(self, file: UploadFile):
         """
-        Saves uploaded file to disk and returns the path.
+        Streams the upload to disk while hashing it, and stores it under its
+        sha256 digest (keeping the original extension). Identical uploads map
+        to the same file; different files with the same name no longer collide.
+        Returns (file_path, digest).
         """
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        return str(file_path)
+        suffix = Path(file.filename or "").suffix.lower()
+        temp_path = UPLOAD_DIR / f".{uuid.uuid4().hex}.part"
+        hasher = hashlib.sha256()
+
+        try:
+            with open(temp_path, "wb") as buffer:
+                while True:
+                    chunk = await file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    buffer.write(chunk)
+
+            digest = hasher.hexdigest()
+            file_path = UPLOAD_DIR / f"{digest}{suffix}"
+            if file_path.exists():
+                # Same content already stored
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, file_path)
+        finally:
+            if temp_path.exists():
+                os.remove(temp_path)
+
+        return str(file_path), digest
 
 video_service = VideoService()
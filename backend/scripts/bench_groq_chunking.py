@@ -0,0 +1,72 @@
+"""
+Offline throughput benchmark for chunked Groq transcription: sequential
+(concurrency 1) vs concurrent chunk processing.
+
+Whisper is replaced by a stand-in that sleeps for a fixed request latency
+plus a per-audio-second cost, so no network or API key is needed. By default
+the audio is synthetic too (duration only, empty chunk bytes); pass --audio
+to cut real chunks from a file with ffmpeg.
+
+Run from backend/:
+    python scripts/bench_groq_chunking.py --minutes 60 --concurrency 1,2,4,8
+    python scripts/bench_groq_chunking.py --audio uploads/meeting.mp3
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require API keys at import; the benchmark never calls the APIs
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+from app.core.config import settings
+from app.services.transcription_service import chunk_windows, transcription_service
+
+def make_transcribe(latency: float, seconds_per_audio_second: float, chunk_seconds: float):
+    def transcribe(name: str, chunk_bytes: bytes) -> str:
+        time.sleep(latency + seconds_per_audio_second * chunk_seconds)
+        return f"words from {name}"
+    return transcribe
+
+async def run(audio_path: str, concurrency: int, transcribe) -> float:
+    settings.GROQ_TRANSCRIPTION_CONCURRENCY = concurrency
+    started = time.perf_counter()
+    # Silence the per-chunk progress prints
+    with contextlib.redirect_stdout(io.StringIO()):
+        await transcription_service.transcribe_audio_groq_chunked(audio_path, transcribe=transcribe)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60, help="synthetic audio length (ignored with --audio)")
+    parser.add_argument("--audio", help="real audio file to cut chunks from (needs ffmpeg)")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated GROQ_TRANSCRIPTION_CONCURRENCY values")
+    parser.add_argument("--latency", type=float, default=0.3, help="stand-in request latency in seconds")
+    parser.add_argument("--cost", type=float, default=0.002, help="stand-in seconds of work per audio second")
+    args = parser.parse_args()
+
+    audio_path = args.audio or "synthetic"
+    if not args.audio:
+        duration = args.minutes * 60
+        transcription_service._audio_duration = lambda path: duration
+        transcription_service._read_audio_chunk = lambda path, start, end: b""
+    else:
+        duration = transcription_service._audio_duration(audio_path)
+
+    windows = chunk_windows(duration, settings.GROQ_CHUNK_SECONDS, settings.GROQ_CHUNK_OVERLAP_SECONDS)
+    transcribe = make_transcribe(args.latency, args.cost, settings.GROQ_CHUNK_SECONDS)
+    print(f"{duration / 60:.1f} min audio, {len(windows)} chunks of {settings.GROQ_CHUNK_SECONDS}s")
+    print(f"{'concurrency':>11} {'seconds':>9} {'chunks/s':>9} {'speedup':>8}")
+    baseline = None
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        elapsed = asyncio.run(run(audio_path, concurrency, transcribe))
+        baseline = baseline or elapsed
+        print(f"{concurrency:>11} {elapsed:>9.2f} {len(windows) / elapsed:>9.2f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
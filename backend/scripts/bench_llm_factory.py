@@ -0,0 +1,70 @@
+"""
+Microbenchmark: pooled llm_factory.get_llm / get_chain vs building the chat
+model and chain on every call (what services did before the factory pooled
+them). Only construction is timed; no request is sent, so dummy API keys work.
+
+Run from backend/:
+    python scripts/bench_llm_factory.py --iterations 200
+    python scripts/bench_llm_factory.py --models gemini-1.5-flash
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require API keys at import; nothing here calls the APIs
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+# Keep the benchmark from opening the on-disk response cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_groq import ChatGroq
+from app.core.config import settings
+from app.services.analysis_service import DOMAIN_PROMPT
+from app.services.llm_factory import llm_factory
+
+def build_chain(llm):
+    return DOMAIN_PROMPT | llm | JsonOutputParser()
+
+def per_call_llm(model_name: str):
+    # Pre-pooling construction: a fresh client (and HTTP connection pool) per call
+    provider, model = llm_factory._resolve(model_name)
+    if provider == "gemini":
+        return ChatGoogleGenerativeAI(model=model, google_api_key=settings.GOOGLE_API_KEY, convert_system_message_to_human=True)
+    return ChatGroq(groq_api_key=settings.GROQ_API_KEY, model_name=model, temperature=0)
+
+def timed(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default=f"{settings.DEFAULT_MODEL},gemini-1.5-flash", help="comma-separated model names")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'model':<28} {'case':<10} {'per-call us':>12} {'pooled us':>10} {'speedup':>8}")
+    for model_name in args.models.split(","):
+        llm_factory.reset()
+        started = time.perf_counter()
+        llm_factory.get_chain("domain", build_chain, model_name=model_name)
+        first_use = (time.perf_counter() - started) * 1e6
+
+        cases = [
+            ("llm", lambda: per_call_llm(model_name), lambda: llm_factory.get_llm(model_name)),
+            ("chain", lambda: build_chain(per_call_llm(model_name)),
+             lambda: llm_factory.get_chain("domain", build_chain, model_name=model_name))
+        ]
+        for case, per_call, pooled in cases:
+            per_call_us = timed(per_call, args.iterations)
+            pooled_us = timed(pooled, args.iterations)
+            print(f"{model_name:<28} {case:<10} {per_call_us:>12.1f} {pooled_us:>10.2f} {per_call_us / pooled_us:>7.0f}x")
+        print(f"{model_name:<28} {'first use':<10} {first_use:>12.1f}")
+
+if __name__ == "__main__":
+    main()
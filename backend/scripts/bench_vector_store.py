@@ -0,0 +1,93 @@
+"""
+Recall / latency benchmark: NumpyVectorStore (exact) vs ChromaVectorStore (HNSW).
+
+Inserts the same random unit vectors into both stores, then times top-k
+queries and measures Chroma's recall@k against the exact NumPy results.
+Both stores live in a temporary directory that is removed afterwards.
+
+Run from backend/:
+    python scripts/bench_vector_store.py --sizes 10000,100000
+    python scripts/bench_vector_store.py --sizes 1000000 --skip-chroma
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require API keys at import; the benchmark never calls the APIs
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+from app.services.vector_store import ChromaVectorStore, NumpyVectorStore
+
+# Chroma rejects batches above its max_batch_size (~5k)
+CHROMA_BATCH = 5000
+INSERT_BATCH = 50000
+
+def percentile(samples, q):
+    return float(np.percentile(np.asarray(samples) * 1000, q))
+
+def insert(store, vectors, batch_size):
+    started = time.perf_counter()
+    for start in range(0, len(vectors), batch_size):
+        block = vectors[start:start + batch_size]
+        ids = [f"chunk-{i}" for i in range(start, start + len(block))]
+        metadatas = [{"source_id": f"rec-{i % 100}"} for i in range(start, start + len(block))]
+        store.add(ids, block.tolist() if isinstance(store, ChromaVectorStore) else block, metadatas, [""] * len(block))
+    return time.perf_counter() - started
+
+def run_queries(store, queries, k):
+    latencies, results = [], []
+    for q in queries:
+        started = time.perf_counter()
+        result = store.query(q.tolist(), n_results=k)
+        latencies.append(time.perf_counter() - started)
+        results.append(result["ids"][0])
+    return latencies, results
+
+def recall(exact, approx, k):
+    hits = sum(len(set(e[:k]) & set(a[:k])) for e, a in zip(exact, approx))
+    return hits / (k * len(exact))
+
+def bench(size, dim, n_queries, k, skip_chroma, seed):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((size, dim), dtype=np.float32)
+    queries = rng.standard_normal((n_queries, dim), dtype=np.float32)
+    directory = tempfile.mkdtemp(prefix="bench_vector_store_")
+    rows = []
+    try:
+        numpy_store = NumpyVectorStore(os.path.join(directory, "numpy"))
+        insert_seconds = insert(numpy_store, vectors, INSERT_BATCH)
+        latencies, exact = run_queries(numpy_store, queries, k)
+        rows.append(("numpy", size, insert_seconds, percentile(latencies, 50), percentile(latencies, 95), 1.0))
+
+        if not skip_chroma:
+            chroma_store = ChromaVectorStore("persistent", os.path.join(directory, "chroma"))
+            insert_seconds = insert(chroma_store, vectors, CHROMA_BATCH)
+            latencies, approx = run_queries(chroma_store, queries, k)
+            rows.append(("chroma", size, insert_seconds, percentile(latencies, 50), percentile(latencies, 95), recall(exact, approx, k)))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated store sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension (text-embedding-004 is 768)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-chroma", action="store_true", help="only time the NumPy store (e.g. at 1M)")
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'size':>9} {'insert s':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for backend, n, insert_seconds, p50, p95, rec in bench(size, args.dim, args.queries, args.k, args.skip_chroma, args.seed):
+            print(f"{backend:<8} {n:>9} {insert_seconds:>9.2f} {p50:>8.2f} {p95:>8.2f} {rec:>9.3f}")
+
+if __name__ == "__main__":
+    main()
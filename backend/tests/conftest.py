@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Run from backend/ (python -m pytest) with dummy keys: nothing here talks to a provider
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("GROQ_API_KEY", "test")
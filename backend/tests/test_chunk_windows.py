@@ -0,0 +1,19 @@
+import pytest
+from app.services.transcription_service import chunk_windows
+
+@pytest.mark.parametrize("duration, expected", [
+    (0, []),
+    (300, [(0, 300)]),
+    (600, [(0, 600)]),
+    (600.5, [(0, 600.5)]),
+    (605, [(0, 605)]),
+    (606, [(0, 605), (600, 606)]),
+    (1203, [(0, 605), (600, 1203)]),
+    (1205, [(0, 605), (600, 1205)]),
+    (1210, [(0, 605), (600, 1205), (1200, 1210)]),
+])
+def test_no_window_starts_inside_the_previous_overlap(duration, expected):
+    assert chunk_windows(duration, 600, 5) == expected
+
+def test_windows_cover_the_whole_duration_without_overlap():
+    assert chunk_windows(1200.5, 600) == [(0, 600), (600, 1200), (1200, 1200.5)]
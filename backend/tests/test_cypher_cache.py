@@ -0,0 +1,34 @@
+from app.services.cypher_cache import parameterize
+
+class FakeCanonicalizer:
+    def __init__(self, names):
+        self.names = names
+
+    def find_mentions(self, text):
+        found = []
+        for name in self.names:
+            start = text.find(name)
+            if start >= 0:
+                found.append((start, start + len(name), "Person", name))
+        return found
+
+def test_prompt_keeps_case_of_unknown_names():
+    template, prompt, params, kinds = parameterize(
+        "Which meetings mentioned Carol Danvers from OpenAI?", FakeCanonicalizer([])
+    )
+    assert template == "which meetings mentioned carol danvers from openai"
+    assert prompt == "Which meetings mentioned Carol Danvers from OpenAI?"
+    assert params == {} and kinds == {}
+
+def test_known_entities_become_placeholders_in_both():
+    template, prompt, params, kinds = parameterize(
+        "Meetings with Alice about \"Q3 Roadmap\" since 2023?", FakeCanonicalizer(["Alice"])
+    )
+    assert template == "meetings with $p0 about $p1 since $p2"
+    assert prompt == "Meetings with $p0 about $p1 since $p2?"
+    assert params == {"p0": "Alice", "p1": "Q3 Roadmap", "p2": 2023}
+    assert kinds == {"p0": "Person", "p1": "value", "p2": "number"}
+
+def test_questions_differing_only_in_entities_share_a_template():
+    canonicalizer = FakeCanonicalizer(["Alice", "Bob"])
+    assert parameterize("Meetings with Alice", canonicalizer)[0] == parameterize("meetings with Bob!", canonicalizer)[0]
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import pytest
+from google.genai import types
+from app.core.config import settings
+from app.services.transcription_service import TranscriptionService
+
+class FakeFiles:
+    """
+    Stand-in for client.aio.files: the file stays PROCESSING for `processing_polls` gets.
+    """
+    def __init__(self, processing_polls: int, final_state=types.FileState.ACTIVE):
+        self.processing_polls = processing_polls
+        self.final_state = final_state
+        self.polls = 0
+
+    async def get(self, name: str):
+        self.polls += 1
+        state = types.FileState.PROCESSING if self.polls <= self.processing_polls else self.final_state
+        return SimpleNamespace(name=name, state=state)
+
+def make_service(files: FakeFiles) -> TranscriptionService:
+    service = TranscriptionService()
+    service.client = SimpleNamespace(aio=SimpleNamespace(files=files))
+    return service
+
+def processing_file():
+    return SimpleNamespace(name="files/test", state=types.FileState.PROCESSING)
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_POLL_INITIAL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "GEMINI_POLL_MAX_SECONDS", 0.04)
+
+def test_event_loop_keeps_serving_while_gemini_processes():
+    from app.main import app
+
+    files = FakeFiles(processing_polls=5)
+    service = make_service(files)
+
+    async def scenario():
+        ticks = 0
+        health = []
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        async def health_checks():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                while not done.is_set():
+                    health.append((await client.get("/health")).status_code)
+                    await asyncio.sleep(0.01)
+
+        async def wait():
+            try:
+                return await service.wait_for_file_active(processing_file(), timeout=5)
+            finally:
+                done.set()
+
+        result, _, _ = await asyncio.gather(wait(), ticker(), health_checks())
+        return result, ticks, health
+
+    result, ticks, health = asyncio.run(scenario())
+    assert result.state == types.FileState.ACTIVE
+    assert files.polls == 6
+    # Other work ran between polls instead of waiting behind them
+    assert ticks > files.polls
+    assert health and all(status == 200 for status in health)
+
+def test_wait_for_file_active_times_out():
+    files = FakeFiles(processing_polls=10**6)
+    service = make_service(files)
+    with pytest.raises(TimeoutError):
+        asyncio.run(service.wait_for_file_active(processing_file(), timeout=0.2))
+    assert files.polls > 1
+
+def test_wait_for_file_active_raises_when_processing_fails():
+    service = make_service(FakeFiles(processing_polls=1, final_state=types.FileState.FAILED))
+    with pytest.raises(Exception, match="processing failed"):
+        asyncio.run(service.wait_for_file_active(processing_file(), timeout=5))
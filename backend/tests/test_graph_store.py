@@ -0,0 +1,51 @@
+import networkx as nx
+from app.services.graph_store import GraphStore
+
+def load_graph(directory) -> nx.Graph:
+    graph = nx.Graph()
+    for nodes, edges in GraphStore(str(directory), compact_bytes=1 << 30).load():
+        graph.add_nodes_from(nodes)
+        graph.add_edges_from(edges)
+    return graph
+
+def test_compaction_keeps_other_workers_mutations(tmp_path):
+    # Two workers sharing the directory, each with only its own updates in memory
+    first = GraphStore(str(tmp_path), compact_bytes=1 << 30)
+    second = GraphStore(str(tmp_path), compact_bytes=1 << 30)
+    first.append([("c1", {"type": "Chunk"}), ("Acme", {"type": "Customer"})], [("Acme", "c1", {"relation": "MENTIONED_IN"})])
+    second.append([("c2", {"type": "Chunk"}), ("Globex", {"type": "Competitor"})], [("Globex", "c2", {"relation": "MENTIONED_IN"})])
+    first.compact()
+    second.append([("Acme", {"type": "Customer"})], [("Acme", "Globex", {"relation": "COMPETES_WITH"})])
+    second.compact()
+
+    graph = load_graph(tmp_path)
+    assert set(graph.nodes) == {"c1", "c2", "Acme", "Globex"}
+    assert graph.nodes["Globex"]["type"] == "Competitor"
+    assert graph.edges["Acme", "Globex"]["relation"] == "COMPETES_WITH"
+    assert graph.number_of_edges() == 3
+    assert not (tmp_path / "graph.log.compacting").exists()
+
+def test_compacted_store_matches_replayed_log(tmp_path):
+    store = GraphStore(str(tmp_path), compact_bytes=1 << 30)
+    updates = [
+        ([("a", {"type": "Product"}), ("b", {"type": None})], [("a", "b", {"relation": "USES"})]),
+        ([("b", {"type": "Feature"})], [("b", "a", {"relation": "PART_OF"}), ("c", "a", {"relation": "MENTIONED_IN"})])
+    ]
+    for nodes, edges in updates:
+        store.append(nodes, edges)
+    before = load_graph(tmp_path)
+    store.compact()
+    after = load_graph(tmp_path)
+
+    assert dict(after.nodes(data="type")) == dict(before.nodes(data="type"))
+    assert {frozenset((s, t)): r for s, t, r in after.edges(data="relation")} == \
+        {frozenset((s, t)): r for s, t, r in before.edges(data="relation")}
+
+def test_a_second_compactor_skips_while_one_holds_the_lock(tmp_path):
+    store = GraphStore(str(tmp_path), compact_bytes=1 << 30)
+    store.append([("a", {"type": "Product"})], [])
+    with store._file_lock(store._compact_lock_path):
+        GraphStore(str(tmp_path), compact_bytes=1 << 30).compact()
+        assert not (tmp_path / "snapshot.json").exists()
+    store.compact()
+    assert (tmp_path / "snapshot.json").exists()
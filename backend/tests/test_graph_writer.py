@@ -0,0 +1,91 @@
+import asyncio
+from app.core.config import settings
+from app.services.graph_writer import ENTITY_QUERY, RECORDINGS_QUERY, GraphWriteQueue, InMemoryGraphRunner
+
+RECORDINGS = [
+    ("rec-1", {"people": ["Alice", "Bob"], "companies": ["Acme"], "topics": ["Pricing"]}),
+    ("rec-2", {"people": ["Alice", "Alice"], "companies": ["Acme"], "topics": []}),
+    ("rec-3", {"people": ["Bob"], "companies": [], "topics": ["Pricing", "Security"]}),
+    ("rec-4", {"people": ["Carol"], "companies": ["Acme", "Globex"]}),
+    ("rec-1", {"people": ["Alice"], "companies": [], "topics": ["Pricing"]})
+]
+
+def person_query():
+    return ENTITY_QUERY.format(label="Person", relation="APPEARED_IN")
+
+def company_query():
+    return ENTITY_QUERY.format(label="Company", relation="MENTIONED_IN")
+
+def topic_query():
+    return ENTITY_QUERY.format(label="Topic", relation="DISCUSSED_IN")
+
+def run_queue(queue: GraphWriteQueue, mutations):
+    async def scenario():
+        for source_id, data in mutations:
+            await queue.submit(source_id, data)
+        await queue.flush()
+        await queue.stop()
+    asyncio.run(scenario())
+
+def test_overlapping_recordings_are_coalesced_into_batched_unwinds():
+    runner = InMemoryGraphRunner()
+    queue = GraphWriteQueue(runner=runner, max_pending=100, batch_size=3, flush_interval=0.05)
+    run_queue(queue, RECORDINGS)
+
+    # 5 mutations, at most 3 per transaction
+    assert len(runner.transactions) == 2
+    first, second = (dict(transaction) for transaction in runner.transactions)
+
+    assert first[RECORDINGS_QUERY] == {"ids": ["rec-1", "rec-2", "rec-3"]}
+    # Duplicate (name, recording) rows collapse; rows are sorted
+    assert first[person_query()]["rows"] == [
+        {"name": "Alice", "source_id": "rec-1"},
+        {"name": "Alice", "source_id": "rec-2"},
+        {"name": "Bob", "source_id": "rec-1"},
+        {"name": "Bob", "source_id": "rec-3"}
+    ]
+    assert len(first[company_query()]["rows"]) == 2
+    assert len(first[topic_query()]["rows"]) == 3
+
+    assert second[RECORDINGS_QUERY] == {"ids": ["rec-1", "rec-4"]}
+    assert second[person_query()]["rows"] == [
+        {"name": "Alice", "source_id": "rec-1"},
+        {"name": "Carol", "source_id": "rec-4"}
+    ]
+    assert len(second[company_query()]["rows"]) == 2
+    assert second[topic_query()]["rows"] == [{"name": "Pricing", "source_id": "rec-1"}]
+
+    stats = queue.stats()
+    assert stats["submitted"] == 5
+    assert stats["flushed"] == 5
+    assert stats["batches"] == 2
+    assert stats["max_batch_size"] == 3
+    assert stats["avg_batch_size"] == 2.5
+    assert stats["version"] == 2
+    assert stats["dropped"] == 0 and stats["failed_flushes"] == 0
+    assert stats["pending"] == 0
+
+def test_one_transaction_when_the_batch_is_not_full():
+    runner = InMemoryGraphRunner()
+    queue = GraphWriteQueue(runner=runner, max_pending=100, batch_size=50, flush_interval=0.05)
+    run_queue(queue, RECORDINGS)
+
+    assert len(runner.transactions) == 1
+    statements = dict(runner.transactions[0])
+    assert statements[RECORDINGS_QUERY] == {"ids": ["rec-1", "rec-2", "rec-3", "rec-4"]}
+    assert queue.stats()["batches"] == 1 and queue.stats()["max_batch_size"] == 5
+
+def test_failed_batches_are_retried_then_dropped(monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_WRITE_RETRIES", 0)
+
+    class FailingRunner:
+        async def run_transaction(self, statements):
+            raise ConnectionError("Graph database disconnected")
+
+    queue = GraphWriteQueue(runner=FailingRunner(), max_pending=100, batch_size=10, flush_interval=0.01)
+    run_queue(queue, RECORDINGS[:2])
+
+    stats = queue.stats()
+    assert stats["dropped"] == 2
+    assert stats["failed_flushes"] == 1
+    assert stats["batches"] == 0 and stats["version"] == 0
@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from neo4j.exceptions import ServiceUnavailable
+import app.db.neo4j as neo4j_module
+import app.services.knowledge_graph_service as kg_module
+import app.services.graph_insights as insights_module
+from app.core.config import settings
+from app.db.neo4j import Neo4jConnection
+from app.services.entity_canonicalizer import entity_canonicalizer
+
+class FakeServer:
+    """
+    Stand-in for the Neo4j server behind AsyncGraphDatabase.driver: unreachable
+    until `up` is set; records every query it runs.
+    """
+    def __init__(self):
+        self.up = False
+        self.queries = []
+        self.degrees = []
+
+    def driver(self, uri, **kwargs):
+        return FakeDriver(self)
+
+class FakeDriver:
+    def __init__(self, server):
+        self.server = server
+
+    async def verify_connectivity(self):
+        if not self.server.up:
+            raise ServiceUnavailable("connection refused")
+
+    async def close(self):
+        pass
+
+    def session(self, **kwargs):
+        return FakeSession(self.server)
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def data(self):
+        return self.rows
+
+class FakeSession:
+    def __init__(self, server):
+        self.server = server
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, parameters):
+        text = query.text
+        self.server.queries.append(text)
+        if "MATCH (n:Person)" in text:
+            return FakeResult([{"name": "Carol Danvers"}])
+        if text == insights_module.DEGREES_QUERY:
+            return FakeResult(self.server.degrees)
+        return FakeResult([])
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr(neo4j_module.AsyncGraphDatabase, "driver", server.driver)
+    monkeypatch.setattr(settings, "NEO4J_RECONNECT_SECONDS", 0.01)
+    conn = Neo4jConnection()
+    monkeypatch.setattr(kg_module, "neo4j_conn", conn)
+    monkeypatch.setattr(kg_module, "degree_index", insights_module.EntityDegreeIndex(settings.INSIGHTS_TOP_N))
+    server.conn = conn
+    return server
+
+async def wait_for(condition, timeout: float = 2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def test_graph_setup_runs_once_neo4j_comes_up(server):
+    service = kg_module.KnowledgeGraphService()
+
+    async def scenario():
+        await service.initialize()
+        assert server.conn.breaker.state != "closed"
+        assert not any("CREATE CONSTRAINT" in q for q in server.queries)
+
+        server.up = True
+        await wait_for(lambda: any("CREATE CONSTRAINT" in q for q in server.queries))
+        await wait_for(lambda: service._setup_generation == server.conn.generation)
+        await server.conn.close()
+
+    asyncio.run(scenario())
+    assert server.conn.breaker.state == "closed"
+    assert sum("CREATE CONSTRAINT" in q for q in server.queries) == len(kg_module.SCHEMA_STATEMENTS)
+    assert entity_canonicalizer.find_mentions("notes on Carol Danvers")
+
+def test_degree_index_loads_once_neo4j_comes_up(server):
+    service = kg_module.KnowledgeGraphService()
+
+    async def scenario():
+        await service.initialize()
+        assert not kg_module.degree_index.ready
+        # The refresher is running even though Neo4j was down at startup
+        assert service._refresher is not None and not service._refresher.done()
+
+        server.up = True
+        await wait_for(lambda: kg_module.degree_index.ready)
+        await server.conn.close()
+
+    asyncio.run(scenario())
+
+def test_graph_setup_runs_once_per_connection(server):
+    server.up = True
+    service = kg_module.KnowledgeGraphService()
+
+    async def scenario():
+        await service.initialize()
+        # Let the connect listener's task run too
+        await asyncio.sleep(0.05)
+        await server.conn.close()
+
+    asyncio.run(scenario())
+    assert sum("CREATE CONSTRAINT" in q for q in server.queries) == len(kg_module.SCHEMA_STATEMENTS)
+
+def test_malformed_uri_opens_the_breaker_instead_of_raising(monkeypatch):
+    monkeypatch.setattr(settings, "NEO4J_URI", "not-a-uri")
+    monkeypatch.setattr(settings, "NEO4J_RECONNECT_SECONDS", 60)
+    conn = Neo4jConnection()
+
+    async def scenario():
+        first = await conn.available()
+        second = await conn.available()
+        await conn.close()
+        return first, second
+
+    assert asyncio.run(scenario()) == (False, False)
+    assert conn.breaker.state == "open"
+    assert conn.breaker.last_error
@@ -0,0 +1,16 @@
+from app.services.vector_store import NumpyVectorStore
+
+def test_numpy_store_skips_ids_it_already_has(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.add(["a", "b"], [[1, 0], [0, 1]], [{"v": 1}, {"v": 2}], ["first a", "first b"])
+    store.add(["a", "c", "c"], [[1, 0], [1, 1], [0, 1]], [{"v": 3}, {"v": 4}, {"v": 5}], ["second a", "c", "c again"])
+
+    assert store.count() == 3
+    result = store.query([1, 0], n_results=10)
+    assert sorted(result["ids"][0]) == ["a", "b", "c"]
+    assert store.get(["a", "c"])["documents"] == ["first a", "c"]
+
+    # Survives a reload from disk
+    reloaded = NumpyVectorStore(str(tmp_path))
+    assert reloaded.count() == 3
+    assert reloaded.query([1, 0], n_results=1)["ids"] == [["a"]]